@@ -0,0 +1,126 @@
+"""
+Assets Module
+Process-wide cache of display-ready team logos, backed by an on-disk cache of scaled images.
+"""
+import hashlib
+import os
+
+import pygame
+
+from text_cache import TextCache
+
+# Scaled logos are kept here between runs unless FOOTBALL_SIM_CACHE says otherwise
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "football-simulator", "logos")
+
+class AssetCache:
+    """Logo surfaces keyed by (path, size, display format), shared by every Team
+
+    Logos are converted with convert_alpha() once a display exists, so blits
+    need no per-frame pixel-format conversion. Scaled copies of logo files are
+    saved as small PNGs in `cache_dir`, keyed by the source file's path, size
+    and modification time, so later runs skip decoding and scaling the
+    original. Surfaces are shared, so callers must not draw on them.
+    """
+    def __init__(self, cache_dir=None):
+        if cache_dir is None:
+            cache_dir = os.environ.get("FOOTBALL_SIM_CACHE", DEFAULT_CACHE_DIR)
+        self.cache_dir = cache_dir
+        self.surfaces = {}
+        self.text = TextCache()
+
+        # Counters for checking where logos came from
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+    def display_format(self):
+        """Pixel format of the display, or None before a display is set up"""
+        display = pygame.display.get_surface()
+        if display is None:
+            return None
+        return (display.get_bitsize(), display.get_masks())
+
+    def optimize(self, surface):
+        """Convert a surface to the display format, keeping its alpha"""
+        if pygame.display.get_surface() is None:
+            return surface
+        return surface.convert_alpha()
+
+    def disk_path(self, path, size):
+        """Location of the scaled copy of `path` in the on-disk cache"""
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{size}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".png")
+
+    def load_scaled(self, path, size):
+        """Load `path` scaled to a square of `size`, through the on-disk cache"""
+        cached = self.disk_path(path, size)
+        if os.path.exists(cached):
+            try:
+                surface = pygame.image.load(cached)
+                self.disk_hits += 1
+                return surface
+            except pygame.error:
+                # A damaged cache file is replaced below
+                pass
+
+        surface = pygame.transform.scale(pygame.image.load(path), (size, size))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write then rename, so other processes never read a partial file
+            partial = f"{cached}.{os.getpid()}.tmp.png"
+            pygame.image.save(surface, partial)
+            os.replace(partial, cached)
+            self.disk_writes += 1
+        except (OSError, pygame.error):
+            # The disk cache is only an optimisation
+            pass
+        return surface
+
+    def fallback(self, size, color, letter):
+        """Circle in the team colour with a letter, for teams without a logo file"""
+        surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(surface, color, (size//2, size//2), size//2)
+        text = self.text.render(letter, min(24, size), (255, 255, 255))
+        surface.blit(text, text.get_rect(center=(size//2, size//2)))
+        return surface
+
+    def logo(self, path, size, color, letter):
+        """Return the display-ready logo for a team, or its fallback if `path` can't be loaded"""
+        size = int(size)
+        display_format = self.display_format()
+        key = (path, size, display_format)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        try:
+            surface = self.load_scaled(path, size)
+        except (pygame.error, FileNotFoundError):
+            # Fallbacks differ per team, so they are cached by colour and letter
+            key = (None, size, display_format, tuple(color), letter)
+            surface = self.surfaces.get(key)
+            if surface is not None:
+                self.hits += 1
+                return surface
+            surface = self.fallback(size, color, letter)
+
+        self.misses += 1
+        surface = self.optimize(surface)
+        self.surfaces[key] = surface
+        return surface
+
+    def stats(self):
+        """Return the cache counters as a dict"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "disk_writes": self.disk_writes,
+            "surfaces": len(self.surfaces),
+        }
+
+# Shared by every Team in the process, so logos survive resets and new games
+assets = AssetCache()
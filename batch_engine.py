@@ -0,0 +1,236 @@
+"""
+Batch Engine Module
+Vectorized match physics that advances many independent matches at once.
+"""
+import math
+
+import numpy as np
+
+from engine import DEFAULT_KICKOFF
+from settings import Settings
+
+class BatchEngine:
+    """Steps N matches in lockstep using NumPy arrays instead of Python objects
+
+    State is stored team-major so every per-team column is contiguous:
+    ``pos`` and ``vel`` have shape (teams, 2, n), ``score`` has shape (teams, n)
+    and ``rotation`` has shape (n,) in unwrapped degrees. Positions are relative
+    to the field center.
+    The rules are the same as MatchEngine; only two-team matches are supported.
+    """
+    def __init__(self, n, settings=None, seed=None, field_radius=130, goal_width=40,
+                 goal_height=15, center=(200, 300), fps=60, kickoff=None):
+        self.n = n
+        self.settings = settings if settings is not None else Settings()
+        self.rng = np.random.default_rng(seed)
+
+        # Field parameters
+        self.field_center_x, self.field_center_y = center
+        self.field_radius = field_radius
+
+        # Goal parameters
+        self.goal_width = goal_width
+        self.goal_height = goal_height
+
+        # Ticks per second of match time
+        self.fps = fps
+
+        self.kickoff = kickoff if kickoff is not None else DEFAULT_KICKOFF
+        if len(self.kickoff) != 2:
+            raise ValueError("BatchEngine needs a two-team kickoff")
+        self.sizes = [size for _, _, size in self.kickoff]
+
+        # Per-match rotation speed, so callers may vary it across the batch
+        self.rotation_speed = np.full(n, self.settings.rotation_speed, dtype=np.float64)
+
+        self.pos = np.empty((len(self.kickoff), 2, n))
+        self.vel = np.empty((len(self.kickoff), 2, n))
+        self.score = np.empty((len(self.kickoff), n), dtype=np.int32)
+        self.rotation = np.empty(n)
+
+        # One-dimensional views of each team's components; indexing these is
+        # much cheaper than indexing the 3-D arrays with a row array
+        self._x = [self.pos[i, 0] for i in range(len(self.kickoff))]
+        self._y = [self.pos[i, 1] for i in range(len(self.kickoff))]
+        self._vx = [self.vel[i, 0] for i in range(len(self.kickoff))]
+        self._vy = [self.vel[i, 1] for i in range(len(self.kickoff))]
+
+        # Scratch buffers reused every tick
+        self._delta = np.empty((2, n))
+        self._dist_sq = np.empty(n)
+
+        self.reset()
+
+    @property
+    def game_time(self):
+        """Elapsed match time in seconds"""
+        return self.tick / self.fps
+
+    def reset(self):
+        """Put every match back at kickoff and clear the scores"""
+        for i, (offset, velocity, _) in enumerate(self.kickoff):
+            self.pos[i, 0] = offset[0]
+            self.pos[i, 1] = offset[1]
+            self.vel[i, 0] = velocity[0]
+            self.vel[i, 1] = velocity[1]
+
+        self.score.fill(0)
+        self.rotation.fill(0)
+        self.tick = 0
+        self.finished = False
+
+        # Goal log as parallel chunks of (tick, match index, scoring team)
+        self._goal_ticks = []
+        self._goal_matches = []
+        self._goal_teams = []
+
+    def respawn(self, team_idx, rows):
+        """Return the given matches' team to the center with a random velocity"""
+        count = len(rows)
+        offsets = self.rng.uniform(-20, 20, size=(2, count))
+        angle = self.rng.uniform(0, 2 * math.pi, size=count)
+        speed = self.rng.uniform(2, 4, size=count)
+
+        self._x[team_idx][rows] = offsets[0]
+        self._y[team_idx][rows] = offsets[1]
+        self._vx[team_idx][rows] = speed * np.cos(angle)
+        self._vy[team_idx][rows] = speed * np.sin(angle)
+
+    def handle_boundary(self, team_idx):
+        """Score or bounce every match whose team has crossed the boundary
+
+        Returns the indices of matches where the team conceded this tick.
+        """
+        x, y = self._x[team_idx], self._y[team_idx]
+
+        # Squared distance from the center, compared without a square root
+        pos = self.pos[team_idx]
+        np.einsum("ij,ij->j", pos, pos, out=self._dist_sq)
+
+        limit = self.field_radius - self.sizes[team_idx] / 2
+        out = (self._dist_sq > limit * limit).nonzero()[0]
+        if len(out) == 0:
+            return out
+
+        # Only the few matches at the boundary pay for trigonometry
+        dist = np.sqrt(self._dist_sq[out])
+        nx = x[out] / dist
+        ny = y[out] / dist
+
+        # Goal window test: the team's bearing lies within half a goal angle of
+        # the goal direction, i.e. cos(bearing - rotation) > cos(half angle)
+        half_goal_angle = self.goal_width / (2 * self.field_radius)
+        rotation_rad = np.radians(self.rotation[out])
+        facing = nx * np.cos(rotation_rad) + ny * np.sin(rotation_rad)
+        in_goal = facing > math.cos(half_goal_angle)
+
+        conceded = out[in_goal]
+        if len(conceded):
+            other_idx = 1 if team_idx == 0 else 0
+            self.score[other_idx, conceded] += 1
+            self._goal_ticks.append(np.full(len(conceded), self.tick, dtype=np.int32))
+            self._goal_matches.append(conceded)
+            self._goal_teams.append(np.full(len(conceded), other_idx, dtype=np.int8))
+            self.respawn(team_idx, conceded)
+
+        bounce = ~in_goal
+        bounced = out[bounce]
+        if len(bounced):
+            # Reflect velocity about the boundary normal (same as the angle form
+            # 2 * angle - vel_angle - pi used by MatchEngine)
+            vx, vy = self._vx[team_idx], self._vy[team_idx]
+            nx = nx[bounce]
+            ny = ny[bounce]
+            bvx = vx[bounced]
+            bvy = vy[bounced]
+            dot = 2 * (bvx * nx + bvy * ny)
+            vx[bounced] = bvx - dot * nx
+            vy[bounced] = bvy - dot * ny
+
+            # Move team inside boundary
+            x[bounced] = (limit - 1) * nx
+            y[bounced] = (limit - 1) * ny
+
+        return conceded
+
+    def handle_contact(self, team_idx, skip):
+        """Exchange velocities where the team touches the other team"""
+        other_idx = 1 if team_idx == 0 else 0
+        delta = self._delta
+        np.subtract(self.pos[team_idx], self.pos[other_idx], out=delta)
+        np.einsum("ij,ij->j", delta, delta, out=self._dist_sq)
+
+        # A team that just conceded skips the contact check this tick
+        if len(skip):
+            self._dist_sq[skip] = np.inf
+
+        # Teams touch when their centers are closer than their mean size
+        reach = (self.sizes[team_idx] + self.sizes[other_idx]) / 2
+        rows = (self._dist_sq < reach * reach).nonzero()[0]
+        if len(rows) == 0:
+            return
+
+        # Unit vector from the other team to this team (atan2(0, 0) == 0)
+        dist = np.sqrt(self._dist_sq[rows])
+        safe = np.where(dist > 0, dist, 1.0)
+        nx = np.where(dist > 0, delta[0, rows] / safe, 1.0)
+        ny = np.where(dist > 0, delta[1, rows] / safe, 0.0)
+
+        vx, vy = self._vx[team_idx], self._vy[team_idx]
+        other_vx, other_vy = self._vx[other_idx], self._vy[other_idx]
+        team_speed = np.hypot(vx[rows], vy[rows])
+        other_speed = np.hypot(other_vx[rows], other_vy[rows])
+
+        # Exchange speeds along the contact direction
+        vx[rows] = other_speed * nx
+        vy[rows] = other_speed * ny
+        other_vx[rows] = -team_speed * nx
+        other_vy[rows] = -team_speed * ny
+
+        # Separate teams
+        half_overlap = (reach - dist) / 2
+        shift_x = half_overlap * nx
+        shift_y = half_overlap * ny
+        self._x[team_idx][rows] += shift_x
+        self._y[team_idx][rows] += shift_y
+        self._x[other_idx][rows] -= shift_x
+        self._y[other_idx][rows] -= shift_y
+
+    def step(self):
+        """Advance every match by one tick"""
+        if self.finished:
+            return
+
+        # Rotate fields (left unwrapped: the goal test only takes its cosine,
+        # and a per-tick modulo would cost more than the rest of the tick)
+        self.rotation += self.rotation_speed
+
+        # Advance the shared clock and stop at full time
+        self.tick += 1
+        if self.game_time >= self.settings.match_duration:
+            self.finished = True
+            return
+
+        # Move teams one after another, as MatchEngine does
+        for i in range(len(self.kickoff)):
+            self.pos[i] += self.vel[i]
+            conceded = self.handle_boundary(i)
+            self.handle_contact(i, conceded)
+
+    def run(self):
+        """Play every match to full time and return the final scores"""
+        while not self.finished:
+            self.step()
+
+        return self.score.T.copy()
+
+    def goals(self):
+        """Return the goal log as (time, match, team) arrays sorted by time"""
+        if not self._goal_ticks:
+            empty = np.empty(0)
+            return empty, empty.astype(np.intp), empty.astype(np.int8)
+
+        ticks = np.concatenate(self._goal_ticks)
+        matches = np.concatenate(self._goal_matches)
+        teams = np.concatenate(self._goal_teams)
+        return ticks / self.fps, matches, teams
@@ -0,0 +1,5 @@
+"""
+Benchmarks Package
+Timing scripts for the engine and renderer. Run the suite with `python -m benchmarks`,
+or a single script with `python -m benchmarks.<name>`.
+"""
@@ -0,0 +1,7 @@
+"""
+Benchmark Entry Point
+Runs the benchmark suite with `python -m benchmarks`.
+"""
+from benchmarks.suite import main
+
+main()
@@ -0,0 +1,84 @@
+"""
+Allocation Benchmark
+Checks that steady-state engine ticks allocate nothing and keep their team state objects.
+"""
+import argparse
+import random
+import sys
+import tracemalloc
+
+from engine import MatchEngine, arena_kickoff
+
+def traced_peak(function):
+    """Bytes the heap rose by during function() above where it ended, and its result
+
+    For a call that keeps nothing this is its temporary heap use. Both sizes
+    come from one reading taken after the call, so the measurement itself adds
+    nothing to them.
+    """
+    tracemalloc.reset_peak()
+    result = function()
+    size, peak = tracemalloc.get_traced_memory()
+    return peak - size, result
+
+def count_allocations(engine, ticks):
+    """Allocation counters over up to `ticks` ticks of a warmed-up engine
+
+    `replaced_objects` counts team pos and vel objects that a tick swapped
+    for new ones. `allocating_ticks` counts ticks whose temporary heap use
+    was not zero, and `peak_bytes` is the largest such use. All three should
+    be zero. Ticks with a goal are only counted, since recording a goal keeps
+    a Goal and the list it is returned in.
+    """
+    stats = {"ticks": 0, "goal_ticks": 0, "replaced_objects": 0, "allocating_ticks": 0, "peak_bytes": 0}
+
+    tracemalloc.start()
+    for _ in range(ticks):
+        if engine.finished:
+            break
+        before = [(id(team.pos), id(team.vel)) for team in engine.teams]
+        peak, goals = traced_peak(engine.step)
+        after = [(id(team.pos), id(team.vel)) for team in engine.teams]
+
+        stats["ticks"] += 1
+        if goals:
+            stats["goal_ticks"] += 1
+            continue
+        stats["replaced_objects"] += sum(old[0] != new[0] or old[1] != new[1]
+                                         for old, new in zip(before, after))
+        if peak > 0:
+            stats["allocating_ticks"] += 1
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+    tracemalloc.stop()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Heap allocations per engine tick")
+    parser.add_argument("--teams", type=int, nargs="+", default=(2, 32), help="team counts to check")
+    parser.add_argument("--ticks", type=int, default=1200, help="ticks to check per run")
+    parser.add_argument("--warmup", type=int, default=120, help="ticks to play before checking")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the engine")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'teams':>6} {'broad':>6} {'ticks':>6} {'goals':>6} {'replaced':>9} {'allocating':>11} {'peak bytes':>11}")
+    for num_teams in args.teams:
+        kickoff = None if num_teams == 2 else arena_kickoff(num_teams)
+        for broad_phase in sorted({False, num_teams > MatchEngine.BROAD_PHASE_MIN_TEAMS}):
+            engine = MatchEngine(rng=random.Random(args.seed), kickoff=kickoff, broad_phase=broad_phase)
+            engine.settings.match_duration = (args.warmup + args.ticks) / engine.fps + 1
+            for _ in range(args.warmup):
+                engine.step()
+
+            stats = count_allocations(engine, args.ticks)
+            print(f"{num_teams:>6} {str(broad_phase):>6} {stats['ticks']:>6} {stats['goal_ticks']:>6} "
+                  f"{stats['replaced_objects']:>9} {stats['allocating_ticks']:>11} {stats['peak_bytes']:>11}")
+            failed = failed or stats["replaced_objects"] or stats["allocating_ticks"]
+
+    # Exit non-zero so scripts and CI notice a tick that allocates again
+    if failed:
+        print("FAIL: steady-state ticks allocated or replaced team state")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
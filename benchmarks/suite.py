@@ -0,0 +1,168 @@
+"""
+Benchmark Suite
+Measures simulation and rendering throughput and compares it with a stored baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+# Benchmarks always draw offscreen, and stdout carries only the report
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+
+def measure(func, min_time=0.2, repeat=5):
+    """Calls of func per second, best of `repeat` runs of at least min_time / repeat seconds"""
+    # Find a call count that takes long enough to time reliably
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat:
+            break
+        number *= 2
+
+    best = number / elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = max(best, number / (time.perf_counter() - start))
+    return best
+
+def new_game():
+    """A simulator a few seconds into a match, with warm caches"""
+    from game import FootballSimulator
+
+    game = FootballSimulator()
+    game.engine.rng.seed(0)
+    game.is_playing = True
+    for _ in range(300):
+        game.update()
+    return game
+
+def physics_tick(game):
+    """One FootballSimulator.update, restarting the match at full time"""
+    def tick():
+        game.update()
+        if not game.is_playing:
+            game.reset_game()
+            game.is_playing = True
+    return tick
+
+def screen_frame(game, state):
+    """An end-to-end frame of draw_frame and flip in one of the screen states"""
+    def frame():
+        game.draw_frame()
+        pygame.display.flip()
+
+    def setup():
+        game.show_settings = state == "settings"
+        game.is_playing = state == "playing"
+        game.engine.tick = game.engine.fps * 10
+        if state == "full_time":
+            game.engine.tick = int(game.settings.match_duration * game.engine.fps) + 1
+    return setup, frame
+
+def benchmarks(game):
+    """Name, unit, setup and function of every benchmark"""
+    ui = game.ui
+    settings = game.settings
+
+    def playing():
+        game.is_playing = True
+        game.show_settings = False
+
+    cases = [
+        ("physics.update", "ticks/s", playing, physics_tick(game)),
+        ("draw.field", "frames/s", None, game.draw_field),
+        ("draw.teams", "frames/s", None, game.draw_teams),
+        ("ui.draw_scoreboard", "frames/s", None,
+         lambda: ui.draw_scoreboard(game.teams, int(game.game_time), settings, game.score_pulse_timer)),
+        ("ui.draw_buttons", "frames/s", None, lambda: ui.draw_buttons(game.is_playing)),
+        ("ui.draw_time_scale", "frames/s", None, lambda: ui.draw_time_scale(16)),
+        ("ui.draw_settings_menu", "frames/s", None, lambda: ui.draw_settings_menu(settings)),
+        ("ui.draw_match_end_screen", "frames/s", None,
+         lambda: ui.draw_match_end_screen(game.teams, settings.match_duration, settings)),
+    ]
+    for state in ("playing", "paused", "settings", "full_time"):
+        setup, frame = screen_frame(game, state)
+        cases.append((f"frame.{state}", "frames/s", setup, frame))
+    return cases
+
+def run(selected=None, min_time=0.2, repeat=5):
+    """Run the benchmarks whose names contain any of `selected` and return the report"""
+    results = {}
+
+    game = new_game()
+    for name, unit, setup, func in benchmarks(game):
+        if selected and not any(part in name for part in selected):
+            continue
+        if setup:
+            setup()
+        results[name] = {"rate": measure(func, min_time, repeat), "unit": unit}
+        print(f"{name:<28} {results[name]['rate']:>12.1f} {unit}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(report, baseline, threshold):
+    """Return (name, baseline rate, rate, change) for every benchmark slower than the baseline by more than threshold"""
+    regressions = []
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        change = result["rate"] / old["rate"] - 1
+        if change < -threshold:
+            regressions.append((name, old["rate"], result["rate"], change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Simulation and rendering throughput")
+    parser.add_argument("names", nargs="*", help="only run benchmarks whose names contain one of these")
+    parser.add_argument("--output", metavar="PATH", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", metavar="PATH", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="slowdown that counts as a regression (default 0.1, i.e. 10%%)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend on each benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark; the best counts")
+    args = parser.parse_args()
+
+    report = run(args.names, args.min_time, args.repeat)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        report["regressions"] = [
+            {"name": name, "baseline": old, "rate": new, "change": change}
+            for name, old, new, change in regressions
+        ]
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.1f} -> {new:.1f} ({change:+.1%})", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    # A non-zero exit lets CI fail on regressions
+    if report.get("regressions"):
+        sys.exit(1)
@@ -0,0 +1,57 @@
+"""
+Team Scaling Benchmark
+Times one engine tick, with and without the broad phase, against the number of teams.
+"""
+import argparse
+import os
+import random
+import time
+
+from engine import MatchEngine, arena_kickoff
+
+DEFAULT_COUNTS = (2, 8, 32, 64, 128, 256)
+
+def time_steps(engine, ticks):
+    """Average wall time of one engine tick in microseconds"""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        engine.step()
+    return (time.perf_counter() - start) / ticks * 1e6
+
+def time_draw(num_teams, frames):
+    """Average wall time of drawing the teams in microseconds, using a hidden window"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from game import FootballSimulator
+
+    game = FootballSimulator(num_teams=num_teams)
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.draw_teams()
+    return (time.perf_counter() - start) / frames * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame time against team count")
+    parser.add_argument("--teams", type=int, nargs="+", default=DEFAULT_COUNTS,
+                        help="team counts to time")
+    parser.add_argument("--ticks", type=int, default=600, help="ticks to time per run")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the engine")
+    parser.add_argument("--draw", action="store_true", help="also time drawing the teams")
+    args = parser.parse_args()
+
+    header = f"{'teams':>6} {'pairs us':>10} {'grid us':>10}"
+    if args.draw:
+        header += f" {'draw us':>10}"
+    print(header)
+
+    for num_teams in args.teams:
+        kickoff = arena_kickoff(num_teams)
+        row = f"{num_teams:>6}"
+        for broad_phase in (False, True):
+            engine = MatchEngine(rng=random.Random(args.seed), kickoff=kickoff, broad_phase=broad_phase)
+            row += f" {time_steps(engine, args.ticks):>10.1f}"
+        if args.draw:
+            row += f" {time_draw(num_teams, args.ticks):>10.1f}"
+        print(row)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Broadcast Module
+Runs one live match and streams its state over TCP to any number of render-only viewers.
+"""
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import time
+
+from engine import DEFAULT_KICKOFF, MatchEngine, arena_kickoff
+from replay import (EVENT_GOAL, HEADER, MAGIC, POS_SCALE, ROTATION_SCALE, VEL_SCALE, VERSION,
+                    ReplayFrame, record_struct)
+from settings import Settings
+
+# Every message is a type byte and a payload length, then the payload
+MESSAGE = struct.Struct("<cH")
+KEYFRAME = b"K"
+DELTA = b"D"
+
+# Keyframe payload: the replay header, team sizes, the tick, then one replay record.
+# Delta payload: tick, rotation and event flags, a bitmask of teams whose velocity
+# changed, every team's position change, the changed velocities and, if the
+# scores changed, all scores
+TICK = struct.Struct("<I")
+DELTA_HEADER = struct.Struct("<IHB")
+
+# Event flag set when the delta carries the scores
+EVENT_SCORES = 0x80
+
+class StateEncoder:
+    """Turns the engine state after each tick into keyframe and delta messages
+
+    The state is quantized exactly as in replay files. Deltas are taken
+    between quantized states, so a viewer that applies every delta after a
+    keyframe holds the same integers as the server and never drifts.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.record = record_struct(len(engine.teams))
+        self.state = None
+        self.events = 0
+
+    def quantize(self):
+        """(tick, rotation, positions, velocities, scores) of the engine as integers"""
+        engine = self.engine
+        positions = []
+        velocities = []
+        for team in engine.teams:
+            positions.append((int(round((team.pos[0] - engine.field_center_x) * POS_SCALE)),
+                              int(round((team.pos[1] - engine.field_center_y) * POS_SCALE))))
+            velocities.append((int(round(team.vel[0] * VEL_SCALE)), int(round(team.vel[1] * VEL_SCALE))))
+        rotation = int(round(engine.rotation * ROTATION_SCALE)) % (360 * ROTATION_SCALE)
+        return (engine.tick, rotation, positions, velocities, [team.score for team in engine.teams])
+
+    def keyframe(self):
+        """Full state of the current tick, from which deltas can follow"""
+        engine = self.engine
+        tick, rotation, positions, velocities, scores = self.state
+        values = [rotation, self.events]
+        for (x, y), (vx, vy) in zip(positions, velocities):
+            values.extend((x, y, vx, vy))
+        values.extend(scores)
+        payload = (HEADER.pack(MAGIC, VERSION, len(engine.teams), engine.fps, engine.field_radius,
+                               engine.goal_width, engine.goal_height, engine.settings.match_duration)
+                   + bytes(int(team.size) for team in engine.teams)
+                   + TICK.pack(tick) + self.record.pack(*values))
+        return MESSAGE.pack(KEYFRAME, len(payload)) + payload
+
+    def advance(self, goals):
+        """Quantize the state after a tick and return the delta from the previous one"""
+        previous = self.state
+        self.state = self.quantize()
+        self.events = EVENT_GOAL if goals else 0
+        if previous is None:
+            return None
+
+        tick, rotation, positions, velocities, scores = self.state
+        events = self.events
+        if scores != previous[4]:
+            events |= EVENT_SCORES
+
+        n = len(positions)
+        mask = bytearray((n + 7) // 8)
+        moves = []
+        changed = []
+        for i in range(n):
+            moves.extend((positions[i][0] - previous[2][i][0], positions[i][1] - previous[2][i][1]))
+            if velocities[i] != previous[3][i]:
+                mask[i // 8] |= 1 << (i % 8)
+                changed.extend(velocities[i])
+
+        payload = (DELTA_HEADER.pack(tick, rotation, events) + bytes(mask)
+                   + struct.pack(f"<{2 * n}h", *moves) + struct.pack(f"<{len(changed)}h", *changed))
+        if events & EVENT_SCORES:
+            payload += struct.pack(f"<{n}H", *scores)
+        return MESSAGE.pack(DELTA, len(payload)) + payload
+
+class StateDecoder:
+    """Rebuilds the match state from a stream of keyframe and delta messages
+
+    Deltas that arrive before the first keyframe are ignored.
+    """
+    def __init__(self):
+        self.buffer = bytearray()
+        self.header = None
+        self.sizes = None
+        self.state = None
+        self.events = 0
+
+    def feed(self, data):
+        """Apply every complete message in data; return the number of ticks applied"""
+        self.buffer += data
+        ticks = 0
+        while len(self.buffer) >= MESSAGE.size:
+            kind, length = MESSAGE.unpack_from(self.buffer)
+            end = MESSAGE.size + length
+            if len(self.buffer) < end:
+                break
+            payload = bytes(self.buffer[MESSAGE.size:end])
+            del self.buffer[:end]
+
+            if kind == KEYFRAME:
+                self.apply_keyframe(payload)
+                ticks += 1
+            elif kind == DELTA and self.state is not None:
+                self.apply_delta(payload)
+                ticks += 1
+        return ticks
+
+    def apply_keyframe(self, payload):
+        self.header = HEADER.unpack_from(payload)
+        n = self.header[2]
+        offset = HEADER.size
+        self.sizes = list(payload[offset:offset + n])
+        offset += n
+        tick, = TICK.unpack_from(payload, offset)
+        values = record_struct(n).unpack_from(payload, offset + TICK.size)
+
+        teams = values[2:2 + 4 * n]
+        positions = [[teams[4*i], teams[4*i + 1]] for i in range(n)]
+        velocities = [[teams[4*i + 2], teams[4*i + 3]] for i in range(n)]
+        self.state = [tick, values[0], positions, velocities, list(values[2 + 4 * n:])]
+        self.events = values[1]
+
+    def apply_delta(self, payload):
+        state = self.state
+        n = len(state[2])
+        tick, rotation, events = DELTA_HEADER.unpack_from(payload)
+        offset = DELTA_HEADER.size
+        mask = payload[offset:offset + (n + 7) // 8]
+        offset += len(mask)
+
+        moves = struct.unpack_from(f"<{2 * n}h", payload, offset)
+        offset += 4 * n
+        for i, position in enumerate(state[2]):
+            position[0] += moves[2 * i]
+            position[1] += moves[2 * i + 1]
+
+        for i, velocity in enumerate(state[3]):
+            if mask[i // 8] & (1 << (i % 8)):
+                velocity[0], velocity[1] = struct.unpack_from("<hh", payload, offset)
+                offset += 4
+
+        if events & EVENT_SCORES:
+            state[4] = list(struct.unpack_from(f"<{n}H", payload, offset))
+
+        state[0] = tick
+        state[1] = rotation
+        self.events = events & ~EVENT_SCORES
+
+    def frame(self):
+        """Current state as a ReplayFrame, or None before the first keyframe"""
+        if self.state is None:
+            return None
+        tick, rotation, positions, velocities, scores = self.state
+        return ReplayFrame(tick, rotation / ROTATION_SCALE,
+                           [(x / POS_SCALE, y / POS_SCALE) for x, y in positions],
+                           [(vx / VEL_SCALE, vy / VEL_SCALE) for vx, vy in velocities],
+                           tuple(scores), self.events)
+
+class Subscriber:
+    """One connected viewer; frames it cannot take are dropped, never queued"""
+    def __init__(self, writer):
+        self.writer = writer
+        self.needs_keyframe = True
+        self.dropped = 0
+
+class MatchServer:
+    """Plays matches in real time and broadcasts each tick to every subscriber
+
+    Each tick is encoded once and the same bytes are written to every
+    subscriber without awaiting the socket. A subscriber whose unsent data
+    exceeds `max_buffer` bytes misses that tick and gets a keyframe as soon as
+    it has caught up, so slow viewers skip frames instead of slowing the match.
+    After full time the result stays up for `interval` seconds before the
+    next match kicks off.
+    """
+    def __init__(self, settings=None, seed=None, num_teams=2, fps=60, interval=5.0, max_buffer=16384):
+        self.settings = settings if settings is not None else Settings()
+        kickoff = DEFAULT_KICKOFF if num_teams == 2 else arena_kickoff(num_teams)
+        self.engine = MatchEngine(self.settings, rng=random.Random(seed), fps=fps, kickoff=kickoff)
+        self.encoder = StateEncoder(self.engine)
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.subscribers = set()
+
+        # Counters for checking the tick loop keeps up
+        self.ticks = 0
+        self.late_ticks = 0
+
+    async def handle_client(self, reader, writer):
+        """Register a viewer and drop it once it disconnects"""
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        subscriber = Subscriber(writer)
+        self.subscribers.add(subscriber)
+        try:
+            # Viewers send nothing; this returns when the connection closes
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+    def broadcast(self, delta):
+        """Send this tick to every subscriber that can take it
+
+        With no delta, only subscribers waiting for a keyframe are sent one.
+        """
+        keyframe = None
+        for subscriber in list(self.subscribers):
+            transport = subscriber.writer.transport
+            if transport.is_closing():
+                self.subscribers.discard(subscriber)
+                continue
+            if transport.get_write_buffer_size() > self.max_buffer:
+                subscriber.needs_keyframe = True
+                subscriber.dropped += 1
+                continue
+
+            if subscriber.needs_keyframe:
+                if keyframe is None:
+                    keyframe = self.encoder.keyframe()
+                transport.write(keyframe)
+                subscriber.needs_keyframe = False
+            elif delta is not None:
+                transport.write(delta)
+
+    async def play(self):
+        """Tick the match at its real-time rate forever, one match after another"""
+        loop = asyncio.get_running_loop()
+        tick_length = 1 / self.engine.fps
+        self.broadcast(self.encoder.advance([]))
+        next_tick = loop.time()
+        held = 0
+
+        while True:
+            next_tick += tick_length
+            if self.engine.finished:
+                # Leave the result up, still greeting new viewers, then start the next match
+                held += tick_length
+                if held >= self.interval:
+                    held = 0
+                    self.engine.reset()
+                    self.broadcast(self.encoder.advance([]))
+                else:
+                    self.broadcast(None)
+            else:
+                goals = self.engine.step()
+                self.broadcast(self.encoder.advance(goals))
+                self.ticks += 1
+
+            delay = next_tick - loop.time()
+            if delay < 0:
+                self.late_ticks += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(0, delay))
+
+    async def serve(self, host="127.0.0.1", port=7777):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await self.play()
+
+class RemoteMatch:
+    """Non-blocking client side of a MatchServer connection, polled once per frame"""
+    def __init__(self, host="127.0.0.1", port=7777, timeout=5.0):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = StateDecoder()
+
+        # Wait for the first keyframe, which describes the field and teams
+        deadline = time.monotonic() + timeout
+        while self.decoder.state is None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No match state from {host}:{port}")
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError(f"{host}:{port} closed the connection")
+            self.decoder.feed(data)
+        self.sock.setblocking(False)
+
+        (_, _, self.num_teams, self.fps, self.field_radius, self.goal_width, self.goal_height,
+         self.match_duration) = self.decoder.header
+        self.sizes = self.decoder.sizes
+        self.connected = True
+
+    def kickoff(self):
+        """Current layout in kickoff form, for building an engine to show the match"""
+        frame = self.decoder.frame()
+        return [(pos, vel, size) for pos, vel, size in zip(frame.positions, frame.velocities, self.sizes)]
+
+    def poll(self):
+        """Read everything that has arrived; return the number of ticks it advanced"""
+        ticks = 0
+        while self.connected:
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                break
+            except ConnectionError:
+                data = b""
+            if not data:
+                self.connected = False
+                break
+            ticks += self.decoder.feed(data)
+        return ticks
+
+    def frame(self):
+        return self.decoder.frame()
+
+    def close(self):
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a live match and broadcast it to viewers")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777, help="port to listen on")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the first match")
+    parser.add_argument("--teams", type=int, default=2, help="number of teams on the field")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between matches")
+    args = parser.parse_args()
+
+    server = MatchServer(seed=args.seed, num_teams=args.teams, interval=args.interval)
+    print(f"Broadcasting on {args.host}:{args.port}; watch with: python main.py --connect {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
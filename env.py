@@ -0,0 +1,198 @@
+"""
+Env Module
+Vectorized training environment: many matches stepped in lockstep, with one team steered by an agent.
+"""
+import math
+
+import numpy as np
+
+from batch_engine import BatchEngine
+from settings import Settings
+
+# Same colours as the game window
+PURPLE = (102, 0, 153)
+WHITE = (255, 255, 255)
+TEAM_COLORS = ((255, 0, 0), (0, 0, 255))
+
+class PixelRenderer:
+    """Draws every match offscreen at observation size, straight into a NumPy frame array
+
+    Uses the game's field sprites and team logos, scaled so the field fills
+    the frame, but no window or FootballSimulator is created. The background
+    and field for each goal rotation are drawn once with pygame and grabbed
+    through surfarray, as are the logos. A frame is then a copy of the cached
+    background with the logos' opaque pixels written over it, which is several
+    times faster than blitting surfaces and reading them back.
+    """
+    def __init__(self, engine, size=(84, 84)):
+        import pygame
+        from assets import assets
+        from field import FieldRenderer
+
+        self.pygame = pygame
+        pygame.font.init()
+
+        self.engine = engine
+        self.size = size
+        width, height = size
+
+        # Scale the field, goal and teams so the field with its goal fits the frame
+        extent = engine.field_radius + engine.goal_height + 2
+        self.scale = min(width, height) / (2 * extent)
+        self.field = FieldRenderer(WHITE, line_width=max(1, round(2 * self.scale)))
+        self.geometry = (engine.field_radius * self.scale, engine.goal_width * self.scale,
+                         engine.goal_height * self.scale)
+        self.center = (width / 2, height / 2)
+        self.backgrounds = {}
+
+        # Each logo as (opaque pixel mask, colours of those pixels, half width, half height);
+        # fallback circles are lettered A and B by position, as in the game
+        self.logos = []
+        for i, team_size in enumerate(engine.sizes):
+            logo = assets.logo(f"team{i + 1}_logo.png", max(1, round(team_size * self.scale)),
+                               TEAM_COLORS[i], chr(ord("A") + i))
+            mask = pygame.surfarray.array_alpha(logo).T >= 128
+            colors = pygame.surfarray.array3d(logo).transpose(1, 0, 2)[mask]
+            self.logos.append((mask, colors, logo.get_width() // 2, logo.get_height() // 2))
+
+    def background(self, rotation):
+        """Background and field for a rotation as an (height, width, 3) array, drawn once per slot"""
+        slot = self.field.quantize(rotation)
+        pixels = self.backgrounds.get(slot)
+        if pixels is None:
+            surface = self.pygame.Surface(self.size)
+            surface.fill(PURPLE)
+            self.field.draw(surface, slot * 360 / self.field.steps, self.center, *self.geometry)
+            # surfarray indexes (x, y); frames are stored row-major like images
+            pixels = self.pygame.surfarray.array3d(surface).transpose(1, 0, 2).copy()
+            self.backgrounds[slot] = pixels
+        return pixels
+
+    def render(self, out):
+        """Fill out, shaped (n, height, width, 3) uint8, with a frame of every match"""
+        engine = self.engine
+        center_x, center_y = self.center
+        scale = self.scale
+        x = engine.pos[:, 0].tolist()
+        y = engine.pos[:, 1].tolist()
+        rotation = engine.rotation.tolist()
+
+        for i in range(engine.n):
+            # Same picture as FootballSimulator.draw_field and draw_teams
+            frame = out[i]
+            frame[...] = self.background(rotation[i])
+            for team, (mask, colors, half_width, half_height) in enumerate(self.logos):
+                left = int(center_x + x[team][i] * scale) - half_width
+                top = int(center_y + y[team][i] * scale) - half_height
+                frame[top:top + mask.shape[0], left:left + mask.shape[1]][mask] = colors
+        return out
+
+class VectorEnv:
+    """Gym-style environment over n two-team matches advanced together by BatchEngine
+
+    The agent steers team `team` in every match. An action is an (n, 2)
+    array of thrusts in [-1, 1], added to the team's velocity at `thrust`
+    pixels per tick squared and capped at `max_speed`. Each action is repeated
+    for `frame_skip` ticks. The reward is goals scored minus goals conceded
+    during the step.
+
+    Observations are float32 state vectors of shape (n, 4 * teams + 3): each
+    team's position over the field radius and velocity over `max_speed`, then
+    the cosine and sine of the goal angle and the fraction of the match
+    played. With `pixels=True` they are instead uint8 frames of shape
+    (n, height, width, 3), and the state vectors are passed in info["state"].
+
+    Work is done once per batch in NumPy; only pixel rendering loops over
+    matches. All matches share one clock, so they end together; the step
+    that ends them returns the final observations in info["final_observation"]
+    and the observations after an automatic reset.
+    """
+    def __init__(self, n, seed=None, settings=None, team=0, pixels=False, pixel_size=(84, 84),
+                 thrust=0.25, max_speed=6.0, frame_skip=1, **engine_kwargs):
+        self.settings = settings if settings is not None else Settings()
+        # BatchEngine raises ValueError for kickoffs without exactly two teams
+        self.engine = BatchEngine(n, self.settings, seed=seed, **engine_kwargs)
+
+        self.n = n
+        self.team = team
+        self.opponent = 1 - team
+        self.thrust = thrust
+        self.max_speed = max_speed
+        self.frame_skip = frame_skip
+
+        self.observation_shape = (n, 4 * len(self.engine.kickoff) + 3)
+        self.action_shape = (n, 2)
+        self.renderer = PixelRenderer(self.engine, pixel_size) if pixels else None
+        if self.renderer:
+            self.observation_shape = (n, pixel_size[1], pixel_size[0], 3)
+
+        # Buffers reused every step
+        self.state = np.empty((n, 4 * len(self.engine.kickoff) + 3), dtype=np.float32)
+        self.frames = np.empty((n, pixel_size[1], pixel_size[0], 3), dtype=np.uint8) if pixels else None
+        self.rewards = np.empty(n, dtype=np.float32)
+        self.speed = np.empty(n)
+
+    def reset(self):
+        """Start new matches with each team heading in a random direction; return observations"""
+        engine = self.engine
+        engine.reset()
+        for i, (_, velocity, _) in enumerate(engine.kickoff):
+            angle = engine.rng.uniform(0, 2 * math.pi, size=self.n)
+            speed = math.hypot(*velocity)
+            engine.vel[i, 0] = speed * np.cos(angle)
+            engine.vel[i, 1] = speed * np.sin(angle)
+        return self.observe()
+
+    def observe_state(self):
+        """State vectors of every match, written into a reused buffer that the next step overwrites"""
+        engine = self.engine
+        state = self.state
+        for i in range(len(engine.kickoff)):
+            state[:, 4*i:4*i + 2] = engine.pos[i].T / engine.field_radius
+            state[:, 4*i + 2:4*i + 4] = engine.vel[i].T / self.max_speed
+        rotation = np.radians(engine.rotation)
+        state[:, -3] = np.cos(rotation)
+        state[:, -2] = np.sin(rotation)
+        state[:, -1] = engine.game_time / self.settings.match_duration
+        return state
+
+    def observe(self):
+        """Observations of every match: state vectors, or pixel frames with pixels=True"""
+        if self.renderer:
+            return self.renderer.render(self.frames).copy()
+        return self.observe_state().copy()
+
+    def apply_actions(self, actions):
+        """Add the clipped thrusts to the steered team's velocity and cap its speed"""
+        vel = self.engine.vel[self.team]
+        vel += self.thrust * np.clip(np.asarray(actions, dtype=np.float64), -1, 1).T
+        np.hypot(vel[0], vel[1], out=self.speed)
+        too_fast = self.speed > self.max_speed
+        if too_fast.any():
+            vel[:, too_fast] *= self.max_speed / self.speed[too_fast]
+
+    def step(self, actions):
+        """Apply actions to every match and return (observations, rewards, dones, info)"""
+        engine = self.engine
+        before = engine.score[self.team] - engine.score[self.opponent]
+        for _ in range(self.frame_skip):
+            self.apply_actions(actions)
+            engine.step()
+            if engine.finished:
+                break
+        np.subtract(engine.score[self.team] - engine.score[self.opponent], before, out=self.rewards)
+
+        info = {}
+        if self.renderer:
+            info["state"] = self.observe_state().copy()
+        observations = self.observe()
+        dones = np.full(self.n, engine.finished)
+        if engine.finished:
+            info["final_observation"] = observations
+            observations = self.reset()
+            if self.renderer:
+                info["state"] = self.observe_state().copy()
+        return observations, self.rewards.copy(), dones, info
+
+    def close(self):
+        self.renderer = None
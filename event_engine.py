@@ -0,0 +1,308 @@
+"""
+Event Engine Module
+Event-driven match physics that jumps straight from one collision to the next.
+"""
+import math
+import random
+
+from engine import DEFAULT_KICKOFF, Goal, MatchResult
+from settings import Settings
+
+# Help for the --event-driven option of the batch tools
+EVENT_DRIVEN_HELP = "use the event-driven engine: faster, but a different model with different odds"
+
+class EventTeam:
+    """Team moving in a straight line from a reference point and time"""
+    def __init__(self, position, velocity, size):
+        # Position relative to the field center at time `t_ref` (in ticks)
+        self.x, self.y = position
+        self.vx, self.vy = velocity
+        self.t_ref = 0.0
+        self.size = size
+        self.score = 0
+
+    def position_at(self, t):
+        """Position relative to the field center at time t"""
+        dt = t - self.t_ref
+        return self.x + self.vx * dt, self.y + self.vy * dt
+
+    def move_to(self, t):
+        """Make time t the new reference point"""
+        self.x, self.y = self.position_at(t)
+        self.t_ref = t
+
+class EventEngine:
+    """Plays a match by solving for the time of each next event
+
+    Time is in ticks but continuous: the next wall and team contacts are found
+    analytically and the match jumps straight to the earliest, so fast teams
+    never tunnel through the wall. It is a different model from MatchEngine,
+    not a faster copy, and its odds differ.
+    """
+    # Relative distance beyond the wall, as a fraction of the limit squared,
+    # that counts as outside rather than rounding after a snap onto the wall
+    WALL_TOLERANCE = 1e-9
+
+    def __init__(self, settings=None, rng=None, field_radius=130, goal_width=40,
+                 goal_height=15, center=(200, 300), fps=60, kickoff=None, stream=None):
+        self.settings = settings if settings is not None else Settings()
+        self.rng = rng if rng is not None else random.Random()
+
+        # Optional EventStream, told about the same events as MatchEngine's
+        self.stream = stream
+
+        # Field parameters
+        self.field_center_x, self.field_center_y = center
+        self.field_radius = field_radius
+
+        # Goal parameters
+        self.goal_width = goal_width
+        self.goal_height = goal_height
+        self.half_goal_angle = math.degrees(goal_width / (2 * field_radius))
+
+        # Ticks per second of match time
+        self.fps = fps
+
+        self.kickoff = kickoff if kickoff is not None else DEFAULT_KICKOFF
+        self.reset()
+
+    @property
+    def score(self):
+        """Current score as a tuple"""
+        return tuple(team.score for team in self.teams)
+
+    def reset(self):
+        """Put the teams back at kickoff and clear the score"""
+        self.teams = [EventTeam(offset, velocity, size) for offset, velocity, size in self.kickoff]
+        self.time = 0.0
+        self.finished = False
+        self.goals = []
+        self.events = 0
+        self.last_touch = [None] * len(self.teams)
+
+        # MatchEngine stops on the first tick whose time reaches full time, and
+        # teams move on every tick before that one
+        self.end_tick = math.ceil(self.settings.match_duration * self.fps)
+        if (self.end_tick - 1) / self.fps >= self.settings.match_duration:
+            self.end_tick -= 1
+        self.end_time = max(0, self.end_tick - 1)
+
+        # Predicted absolute event times
+        self.boundary_times = [self.next_boundary_time(i) for i in range(len(self.teams))]
+        self.pair_times = {}
+        for i in range(len(self.teams)):
+            for j in range(i + 1, len(self.teams)):
+                self.pair_times[(i, j)] = self.next_contact_time(i, j)
+
+        if self.stream is not None:
+            self.stream.emit("kickoff", 0.0, score=self.score)
+
+    def rotation_at(self, t):
+        """Goal rotation in degrees at time t"""
+        return (self.settings.rotation_speed * t) % 360
+
+    def next_boundary_time(self, team_idx):
+        """Time at which the team next reaches the boundary"""
+        team = self.teams[team_idx]
+        dt = self.time - team.t_ref
+        x = team.x + team.vx * dt
+        y = team.y + team.vy * dt
+        limit = self.field_radius - team.size / 2
+
+        # Solve |p + v s| = limit for the positive root s
+        a = team.vx * team.vx + team.vy * team.vy
+        if a == 0:
+            return math.inf
+        b = 2 * (x * team.vx + y * team.vy)
+        c = x * x + y * y - limit * limit
+
+        # A team already beyond the limit (e.g. a kickoff overlapping the wall)
+        # touches it now, whichever way it moves. One snapped onto the wall
+        # sits within rounding of it and next reaches it on the far side
+        if c > self.WALL_TOLERANCE * limit * limit:
+            return self.time
+
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return math.inf
+        s = (-b + math.sqrt(disc)) / (2 * a)
+        return self.time + s if s > 0 else self.time
+
+    def next_contact_time(self, i, j):
+        """Time at which teams i and j next touch, or inf if they never will"""
+        team, other = self.teams[i], self.teams[j]
+        wx, wy = team.vx - other.vx, team.vy - other.vy
+
+        # Separation at the current time
+        dt1 = self.time - team.t_ref
+        dt2 = self.time - other.t_ref
+        dx = team.x + team.vx * dt1 - other.x - other.vx * dt2
+        dy = team.y + team.vy * dt1 - other.y - other.vy * dt2
+        reach = (team.size + other.size) / 2
+
+        # Only approaching teams can collide
+        b = 2 * (dx * wx + dy * wy)
+        if b >= 0:
+            return math.inf
+
+        c = dx * dx + dy * dy - reach * reach
+        if c <= 0:
+            # Already overlapping (e.g. after a respawn): resolve immediately
+            return self.time
+
+        a = wx * wx + wy * wy
+        disc = b * b - 4 * a * c
+        if disc < 0:
+            return math.inf
+        return self.time + (-b - math.sqrt(disc)) / (2 * a)
+
+    def scorer(self, team_idx):
+        """Index of the team credited when `team_idx` leaves through the goal
+
+        As in MatchEngine: the last team it touched, otherwise the nearest one.
+        """
+        if self.last_touch[team_idx] is not None:
+            return self.last_touch[team_idx]
+
+        x, y = self.teams[team_idx].position_at(self.time)
+        nearest = None
+        nearest_dist = math.inf
+        for i, other in enumerate(self.teams):
+            if i == team_idx:
+                continue
+            ox, oy = other.position_at(self.time)
+            dist = (ox - x)**2 + (oy - y)**2
+            if dist < nearest_dist:
+                nearest, nearest_dist = i, dist
+        return nearest
+
+    def handle_boundary(self, team_idx):
+        """Score or bounce a team that has reached the boundary"""
+        team = self.teams[team_idx]
+        team.move_to(self.time)
+        dist = math.sqrt(team.x * team.x + team.y * team.y)
+
+        # Goal window test at the exact moment of contact
+        team_angle = math.degrees(math.atan2(team.y, team.x))
+        relative_angle = (team_angle - self.rotation_at(self.time) + 360) % 360
+        if relative_angle > 360 - self.half_goal_angle or relative_angle < self.half_goal_angle:
+            scorer = self.scorer(team_idx)
+            self.teams[scorer].score += 1
+            goal = Goal(self.time / self.fps, scorer, self.score)
+            self.goals.append(goal)
+            if self.stream is not None:
+                self.stream.emit("goal", goal.time, scorer, team_idx, goal.score)
+            self.respawn_team(team_idx)
+            return goal
+
+        # Reflect velocity about the boundary normal and snap to the wall; a
+        # team reached from outside is already heading back in and keeps going
+        nx, ny = team.x / dist, team.y / dist
+        dot = team.vx * nx + team.vy * ny
+        if dot > 0:
+            team.vx -= 2 * dot * nx
+            team.vy -= 2 * dot * ny
+        limit = self.field_radius - team.size / 2
+        team.x, team.y = limit * nx, limit * ny
+        if self.stream is not None:
+            self.stream.emit("bounce", self.time / self.fps, team_idx)
+        return None
+
+    def handle_contact(self, i, j):
+        """Exchange speeds between two touching teams"""
+        team, other = self.teams[i], self.teams[j]
+        team.move_to(self.time)
+        other.move_to(self.time)
+
+        dx, dy = team.x - other.x, team.y - other.y
+        dist = math.sqrt(dx * dx + dy * dy)
+        if dist > 0:
+            nx, ny = dx / dist, dy / dist
+        else:
+            nx, ny = 1.0, 0.0
+
+        # Each team leaves along the contact line with the other's speed
+        team_speed = math.sqrt(team.vx * team.vx + team.vy * team.vy)
+        other_speed = math.sqrt(other.vx * other.vx + other.vy * other.vy)
+        team.vx, team.vy = other_speed * nx, other_speed * ny
+        other.vx, other.vy = -team_speed * nx, -team_speed * ny
+
+        # Separate teams that started overlapping
+        overlap = (team.size + other.size) / 2 - dist
+        if overlap > 0:
+            team.x += overlap / 2 * nx
+            team.y += overlap / 2 * ny
+            other.x -= overlap / 2 * nx
+            other.y -= overlap / 2 * ny
+
+        self.last_touch[i] = j
+        self.last_touch[j] = i
+        if self.stream is not None:
+            self.stream.emit("collision", self.time / self.fps, i, j)
+
+    def respawn_team(self, team_idx):
+        """Reset team position after conceding"""
+        team = self.teams[team_idx]
+
+        # Set position near center with random offset
+        team.x = self.rng.uniform(-20, 20)
+        team.y = self.rng.uniform(-20, 20)
+        team.t_ref = self.time
+
+        # Give a random velocity
+        angle = self.rng.uniform(0, 2 * math.pi)
+        speed = self.rng.uniform(2, 4)
+        team.vx = speed * math.cos(angle)
+        team.vy = speed * math.sin(angle)
+
+        self.last_touch[team_idx] = None
+
+    def refresh(self, involved):
+        """Recompute predictions for every event involving the given teams"""
+        for i in involved:
+            self.boundary_times[i] = self.next_boundary_time(i)
+        for (i, j) in self.pair_times:
+            if i in involved or j in involved:
+                self.pair_times[(i, j)] = self.next_contact_time(i, j)
+
+    def advance(self):
+        """Jump to the next event and resolve it; return the goal it produced"""
+        if self.finished:
+            return None
+
+        # Earliest predicted event
+        team_idx = min(range(len(self.teams)), key=self.boundary_times.__getitem__)
+        event_time = self.boundary_times[team_idx]
+        pair = None
+        for key, t in self.pair_times.items():
+            if t < event_time:
+                event_time, pair = t, key
+
+        if event_time > self.end_time:
+            # Nothing else happens before full time
+            self.time = self.end_time
+            for team in self.teams:
+                team.move_to(self.time)
+            self.finished = True
+            if self.stream is not None:
+                # Same clock reading as MatchEngine's final tick
+                self.stream.emit("full_time", self.end_tick / self.fps, score=self.score)
+            return None
+
+        self.time = event_time
+        self.events += 1
+        if pair is None:
+            goal = self.handle_boundary(team_idx)
+            self.refresh((team_idx,))
+            return goal
+
+        self.handle_contact(*pair)
+        self.refresh(pair)
+        return None
+
+    def run(self):
+        """Play the match to full time, one event at a time"""
+        while not self.finished:
+            self.advance()
+
+        return MatchResult(self.score, list(self.goals), self.end_tick)
@@ -0,0 +1,149 @@
+"""
+Events Module
+Structured match events delivered to in-memory subscribers and an optional JSON-lines log.
+"""
+import json
+import queue
+import sys
+import threading
+from collections import deque, namedtuple
+
+# A match event: its kind, the match time in seconds, the team it concerns,
+# the other team involved and the score after it, each None when not relevant.
+# Goals name the scoring team and the team that conceded; collisions the two
+# teams that touched; bounces the team that hit the wall
+MatchEvent = namedtuple("MatchEvent", ["kind", "time", "team", "other", "score"])
+
+KINDS = ("kickoff", "goal", "bounce", "collision", "full_time")
+
+class Subscription:
+    """Bounded in-memory queue of events for one subscriber
+
+    Adding an event never blocks: once `max_events` are waiting, the
+    oldest is dropped and counted in `dropped`. Events may be read from
+    another thread.
+    """
+    def __init__(self, max_events=10000, kinds=None):
+        self.events = deque(maxlen=max_events)
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.dropped = 0
+
+    def put(self, event):
+        if self.kinds is not None and event.kind not in self.kinds:
+            return
+        if len(self.events) == self.events.maxlen:
+            self.dropped += 1
+        self.events.append(event)
+
+    def drain(self):
+        """Yield the events waiting now, oldest first, removing them"""
+        events = self.events
+        while events:
+            yield events.popleft()
+
+    def __iter__(self):
+        return self.drain()
+
+    def __len__(self):
+        return len(self.events)
+
+class EventStream:
+    """Hands each event to every subscriber; engines emit into it
+
+    With no subscribers, emitting costs one check and creates nothing.
+    """
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, max_events=10000, kinds=None):
+        """Return a new Subscription receiving events from now on"""
+        return self.attach(Subscription(max_events, kinds))
+
+    def attach(self, subscriber):
+        """Add any object with a put(event) method that never blocks"""
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def detach(self, subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+
+    def emit(self, kind, time, team=None, other=None, score=None):
+        if not self.subscribers:
+            return
+        event = MatchEvent(kind, time, team, other, score)
+        for subscriber in self.subscribers:
+            subscriber.put(event)
+
+def event_json(event):
+    """One event as a compact JSON object, leaving out fields that do not apply"""
+    record = {"event": event.kind, "time": round(event.time, 6)}
+    if event.team is not None:
+        record["team"] = event.team
+    if event.other is not None:
+        record["other"] = event.other
+    if event.score is not None:
+        record["score"] = list(event.score)
+    return json.dumps(record, separators=(",", ":"))
+
+class JsonLinesSink:
+    """Writes events as JSON lines on a background thread
+
+    `put` only hands the event to a bounded queue; if the writer has fallen
+    `max_events` behind, the event is dropped and counted in `dropped`, so
+    the simulation never waits for the disk or terminal. Use "-" as the
+    path to write to stdout. Errors raised by the writer are re-raised by
+    `close`.
+    """
+    def __init__(self, path, stream=None, max_events=10000, kinds=None):
+        self.file = sys.stdout if path == "-" else open(path, "w")
+        self.queue = queue.Queue(max_events)
+        self.kinds = frozenset(kinds) if kinds is not None else None
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self.stream = stream
+        self.thread = threading.Thread(target=self.write_events, daemon=True)
+        self.thread.start()
+        if stream is not None:
+            stream.attach(self)
+
+    def put(self, event):
+        if self.kinds is not None and event.kind not in self.kinds:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_events(self):
+        """Writer thread: write queued events until the None sentinel arrives"""
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                self.file.write(event_json(event) + "\n")
+                self.written += 1
+                # Flush once the queue is empty, not after every line
+                if self.queue.empty():
+                    self.file.flush()
+            except (OSError, ValueError) as error:
+                # Keep draining so put() never finds the queue full for this reason
+                self.error = error
+
+    def close(self):
+        """Stop receiving events, write the queued ones and close the file"""
+        if self.stream is not None:
+            self.stream.detach(self)
+            self.stream = None
+        self.queue.put(None)
+        self.thread.join()
+        if self.file is sys.stdout:
+            self.file.flush()
+        else:
+            self.file.close()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,184 @@
+"""
+Export Module
+Renders matches offscreen and writes the frames to images or video on a background thread.
+"""
+import argparse
+import os
+import queue
+import random
+import shutil
+import subprocess
+import threading
+import time
+
+import pygame
+
+class PngSequenceWriter:
+    """Saves every frame as a numbered PNG in a directory"""
+    def __init__(self, directory, size, fps):
+        self.directory = directory
+        self.size = size
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, index, data):
+        frame = pygame.image.frombytes(data, self.size, "RGB")
+        pygame.image.save(frame, os.path.join(self.directory, f"frame_{index:05d}.png"))
+
+    def close(self):
+        pass
+
+class RawWriter:
+    """Appends raw RGB24 frames to a file, for feeding to any encoder later"""
+    def __init__(self, path, size, fps):
+        self.file = open(path, "wb")
+
+    def write(self, index, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+class EncoderWriter:
+    """Pipes raw RGB24 frames into ffmpeg, which encodes by the output extension (.gif, .mp4, ...)"""
+    def __init__(self, path, size, fps):
+        encoder = shutil.which("ffmpeg")
+        if encoder is None:
+            raise RuntimeError(f"Writing {path} needs ffmpeg on the PATH; export to a directory of PNGs or a .raw file instead")
+
+        self.process = subprocess.Popen(
+            [encoder, "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps),
+             "-i", "-", path],
+            stdin=subprocess.PIPE)
+
+    def write(self, index, data):
+        self.process.stdin.write(data)
+
+    def close(self):
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {self.process.returncode}")
+
+def frame_writer(path, size, fps):
+    """Pick a writer from the output path: a directory, a .raw file or anything ffmpeg can encode"""
+    extension = os.path.splitext(path)[1].lower()
+    if not extension:
+        return PngSequenceWriter(path, size, fps)
+    if extension == ".raw":
+        return RawWriter(path, size, fps)
+    return EncoderWriter(path, size, fps)
+
+class FrameExporter:
+    """Hands frames to a writer on a background thread through a bounded queue
+
+    Drawing and encoding overlap, and `put` blocks when `max_frames` frames
+    are already waiting, so memory use stays fixed however long the clip is.
+    Errors raised by the writer are re-raised by `put` or `close`.
+    """
+    def __init__(self, writer, max_frames=4):
+        self.writer = writer
+        self.queue = queue.Queue(max_frames)
+        self.error = None
+        self.frames = 0
+        self.thread = threading.Thread(target=self.write_frames, daemon=True)
+        self.thread.start()
+
+    def write_frames(self):
+        """Writer thread: write queued frames until the None sentinel arrives"""
+        index = 0
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+            if self.error is None:
+                try:
+                    self.writer.write(index, data)
+                except Exception as error:
+                    # Keep draining so the producer never blocks on a full queue
+                    self.error = error
+            index += 1
+
+    def put(self, data):
+        """Queue one frame of raw RGB bytes"""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(data)
+        self.frames += 1
+
+    def close(self):
+        """Wait for the queued frames to be written and close the writer"""
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+def draw_export_frame(game):
+    """Draw the field, teams, UI overlays and scoring effect, without the buttons"""
+    game.draw_field()
+    game.draw_teams()
+    if game.game_time >= game.settings.match_duration:
+        game.ui.draw_match_end_screen(game.teams, game.game_time, game.settings)
+    else:
+        game.ui.draw_scoreboard(game.teams, int(game.game_time), game.settings, game.score_pulse_timer)
+    game.draw_scoring_effect()
+
+def export_match(path, seed=None, num_teams=2, every=1, hold=2.0, max_frames=4, replay=None):
+    """Play a match offscreen and write its frames to path; return the number of frames
+
+    Every `every`-th tick is written, so the clip plays at fps / every frames
+    per second in real time. The final screen is held for `hold` seconds.
+    """
+    # Draw into an offscreen surface; no window is opened
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    from game import FootballSimulator
+
+    game = FootballSimulator(num_teams=num_teams, replay=replay)
+    game.engine.rng = random.Random(seed)
+    game.is_playing = True
+
+    clip_fps = game.fps / every
+    exporter = FrameExporter(frame_writer(path, game.screen.get_size(), clip_fps), max_frames)
+    tick_length = 1 / game.fps
+    try:
+        tick = 0
+        while game.is_playing:
+            if tick % every == 0:
+                draw_export_frame(game)
+                exporter.put(pygame.image.tobytes(game.screen, "RGB"))
+            if game.replay:
+                game.advance_replay(tick_length)
+            else:
+                game.update()
+            game.update_effects(tick_length)
+            tick += 1
+
+        # Hold the full-time screen
+        for _ in range(max(1, int(hold * clip_fps))):
+            draw_export_frame(game)
+            exporter.put(pygame.image.tobytes(game.screen, "RGB"))
+    finally:
+        exporter.close()
+    return exporter.frames
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a match as PNG frames, a raw RGB stream or video")
+    parser.add_argument("output", help="a directory for PNG frames, a .raw file, or a .gif/.mp4 file (needs ffmpeg)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the match")
+    parser.add_argument("--teams", type=int, default=2, help="number of teams on the field")
+    parser.add_argument("--replay", metavar="PATH", help="export a recorded match instead of playing a new one")
+    parser.add_argument("--every", type=int, default=1, help="write every n-th frame (e.g. 3 for a 20 fps GIF)")
+    parser.add_argument("--queue", type=int, default=4, help="frames that may wait for the writer")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        frames = export_match(args.output, seed=args.seed, num_teams=args.teams, every=args.every,
+                              max_frames=args.queue, replay=args.replay)
+    except RuntimeError as error:
+        parser.exit(1, f"{error}\n")
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {frames} frames to {args.output} in {elapsed:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Field Module
+Draws the field boundary and rotating goal from a cache of pre-rendered sprites.
+"""
+import pygame
+import math
+from collections import OrderedDict
+
+class FieldRenderer:
+    """Caches field sprites keyed by quantized goal rotation
+
+    The arc and goal for each of `steps` rotation angles are drawn once into a
+    colorkeyed, RLE-accelerated sprite in the display's pixel format. Such a
+    sprite blits in a few microseconds and, once RLE-encoded, takes only about
+    10 KB, since SDL drops its raw pixels. At most `max_entries` sprites are
+    kept; the least recently used one is evicted first. Keep `max_entries` at
+    or above `steps` to avoid evicting sprites that the goal will soon reuse.
+    The cache is cleared whenever the field or goal dimensions change.
+
+    Quantizing only leaves the picture unchanged for rotations on the grid of
+    360 / `steps` degrees. The default of 720 steps puts every rotation the
+    default `rotation_speed` of 0.5 degrees per tick reaches on that grid.
+    Other speeds are drawn up to half a step from the physics goal.
+    """
+    # Vertices of a full circle; the arc uses those outside the goal opening
+    ARC_POINTS = 100
+
+    def __init__(self, color, steps=720, max_entries=720, line_width=2):
+        self.color = color
+        self.steps = steps
+        self.max_entries = max_entries
+        self.line_width = line_width
+
+        # Colorkey for the transparent background, chosen to differ from the lines
+        self.key_color = (0, 0, 0) if color != (0, 0, 0) else (255, 0, 255)
+
+        self.sprites = OrderedDict()
+        self.geometry = None
+        self.hits = 0
+        self.misses = 0
+
+    def set_geometry(self, field_radius, goal_width, goal_height):
+        """Drop cached sprites if the field or goal dimensions changed"""
+        geometry = (field_radius, goal_width, goal_height)
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.sprites.clear()
+
+    def quantize(self, rotation):
+        """Map a rotation in degrees to its cache slot"""
+        return int(round(rotation / 360 * self.steps)) % self.steps
+
+    def goal_points(self, rotation, center):
+        """Return the goal corners (left inner, left outer, right outer, right inner)"""
+        field_radius, goal_width, goal_height = self.geometry
+        center_x, center_y = center
+
+        rotation_rad = math.radians(rotation)
+        goal_angle_rad = goal_width / (2 * field_radius)
+
+        # Goal posts
+        goal_left_angle = rotation_rad - goal_angle_rad
+        goal_right_angle = rotation_rad + goal_angle_rad
+        return [
+            (center_x + field_radius * math.cos(goal_left_angle),
+             center_y + field_radius * math.sin(goal_left_angle)),
+            (center_x + (field_radius + goal_height) * math.cos(goal_left_angle),
+             center_y + (field_radius + goal_height) * math.sin(goal_left_angle)),
+            (center_x + (field_radius + goal_height) * math.cos(goal_right_angle),
+             center_y + (field_radius + goal_height) * math.sin(goal_right_angle)),
+            (center_x + field_radius * math.cos(goal_right_angle),
+             center_y + field_radius * math.sin(goal_right_angle)),
+        ]
+
+    def arc_angles(self, rotation):
+        """Return the arc's vertex angles in radians, from one goal post to the other
+
+        Inner vertices sit on a fixed grid of `ARC_POINTS` angles, so only the
+        segments next to the opening change as the goal turns.
+        """
+        field_radius, goal_width, _ = self.geometry
+        rotation_rad = math.radians(rotation)
+        goal_angle_rad = goal_width / (2 * field_radius)
+        spacing = 2 * math.pi / self.ARC_POINTS
+
+        start_angle = rotation_rad + goal_angle_rad
+        end_angle = rotation_rad + 2 * math.pi - goal_angle_rad
+
+        angles = [start_angle]
+        i = math.floor(start_angle / spacing) + 1
+        while i * spacing < end_angle:
+            angles.append((i % self.ARC_POINTS) * spacing)
+            i += 1
+        angles.append(end_angle)
+        return angles
+
+    def field_points(self, rotation, center):
+        """Return the arc points and goal corners for a rotation around center"""
+        field_radius = self.geometry[0]
+        center_x, center_y = center
+
+        # The main circle arc (everything except the goal opening)
+        points = [
+            (center_x + field_radius * math.cos(angle),
+             center_y + field_radius * math.sin(angle))
+            for angle in self.arc_angles(rotation)
+        ]
+
+        return points, self.goal_points(rotation, center)
+
+    def goal_rect(self, rotation, center):
+        """Screen rect covering the goal, its opening and the arc ends beside it"""
+        rotation = self.quantize(rotation) * 360 / self.steps
+        field_radius = self.geometry[0]
+        angles = self.arc_angles(rotation)
+
+        points = self.goal_points(rotation, center)
+        for angle in (angles[1], angles[-2]):
+            points.append((center[0] + field_radius * math.cos(angle),
+                           center[1] + field_radius * math.sin(angle)))
+
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        rect = pygame.Rect(int(min(xs)), int(min(ys)), int(max(xs) - min(xs)) + 1, int(max(ys) - min(ys)) + 1)
+
+        # Allow for the line width
+        return rect.inflate(2 * self.line_width + 2, 2 * self.line_width + 2)
+
+    def render_sprite(self, slot):
+        """Draw the field for one quantized rotation into a new sprite"""
+        field_radius, _, goal_height = self.geometry
+        half = field_radius + goal_height + self.line_width
+        sprite = pygame.Surface((2 * half, 2 * half))
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert()
+        sprite.fill(self.key_color)
+
+        points, goal = self.field_points(slot * 360 / self.steps, (half, half))
+
+        # Draw the circle arc
+        pygame.draw.lines(sprite, self.color, False, points, self.line_width)
+
+        # Draw goal (left post, back, right post)
+        pygame.draw.lines(sprite, self.color, False, goal, self.line_width)
+
+        sprite.set_colorkey(self.key_color, pygame.RLEACCEL)
+        return sprite
+
+    def get_sprite(self, rotation):
+        """Return the cached sprite for a rotation, rendering it on a miss"""
+        slot = self.quantize(rotation)
+        sprite = self.sprites.get(slot)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(slot)
+            return sprite
+
+        self.misses += 1
+        sprite = self.render_sprite(slot)
+        self.sprites[slot] = sprite
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, screen, rotation, center, field_radius, goal_width, goal_height):
+        """Blit the field for the given rotation centred on `center`"""
+        self.set_geometry(field_radius, goal_width, goal_height)
+        sprite = self.get_sprite(rotation)
+        half = sprite.get_width() // 2
+        screen.blit(sprite, (center[0] - half, center[1] - half))
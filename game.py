@@ -5,15 +5,36 @@ This module contains the main game class.
 import pygame
 import sys
 import math
-import random
+import time
+from collections import deque, namedtuple
 from pygame.locals import *
 
+from broadcast import RemoteMatch
+from engine import DEFAULT_KICKOFF, MatchEngine, arena_kickoff, kickoff_for
+from events import EventStream, JsonLinesSink
+from field import FieldRenderer
+from profiler import FrameProfiler
+from renderer import DirtyRectRenderer
+from replay import ReplayPlayer, ReplayRecorder
 from settings import Settings
 from team import Team
 from ui import UI
 
+# Match state plus the view's effect timers, for instant rewind
+GameSnapshot = namedtuple("GameSnapshot", ["engine", "scoring_team", "scoring_effect_timer", "score_pulse_timer"])
+
 class FootballSimulator:
-    def __init__(self):
+    # Selectable simulation speeds (match seconds per wall-clock second)
+    TIME_SCALES = (1, 4, 16, 100)
+    
+    # Playback speeds when watching a replay, including slow motion
+    REPLAY_TIME_SCALES = (0.25, 1, 4, 16)
+    
+    # Match seconds that can be rewound, one snapshot per second
+    REWIND_HISTORY = 120
+    
+    def __init__(self, dirty_rects=False, time_scale=1, num_teams=2, record=None, replay=None,
+                 profile=False, connect=None, clubs=None, events=None):
         # Initialize Pygame
         pygame.init()
         
@@ -29,9 +50,14 @@ class FootballSimulator:
         self.BLUE = (0, 0, 255)
         
         # Game parameters
-        self.fps = 60
+        self.fps = 60  # physics ticks per match second, also the target frame rate
         self.clock = pygame.time.Clock()
         
+        # Fixed-timestep clock: wall time is scaled and banked, then spent in
+        # whole physics ticks, so match time never depends on the frame rate
+        self.time_scale = time_scale
+        self.accumulator = 0
+        
         # Create settings
         self.settings = Settings()
         
@@ -43,86 +69,137 @@ class FootballSimulator:
         # Goal parameters
         self.goal_width = 40
         self.goal_height = 15
-        self.rotation = 0
+        
+        # Two teams play a normal match; more make a free-for-all arena
+        kickoff = DEFAULT_KICKOFF if num_teams == 2 else arena_kickoff(num_teams, self.field_radius)
+        
+        # Two tournament clubs bring their names, logos, sizes and speeds
+        self.clubs = clubs
+        if clubs:
+            self.settings.team1_name = clubs[0].name
+            self.settings.team2_name = clubs[1].name
+            kickoff = kickoff_for(clubs[0], clubs[1])
+        
+        # A replay brings its own field, teams and clock
+        self.replay = ReplayPlayer(replay) if replay else None
+        if self.replay:
+            self.fps = self.replay.fps
+            self.field_radius = self.replay.field_radius
+            self.goal_width = self.replay.goal_width
+            self.goal_height = self.replay.goal_height
+            self.settings.match_duration = self.replay.match_duration
+            kickoff = self.replay.kickoff()
+        
+        # So does a live match from a broadcast server, given as (host, port)
+        self.remote = RemoteMatch(*connect) if connect else None
+        if self.remote:
+            self.fps = self.remote.fps
+            self.field_radius = self.remote.field_radius
+            self.goal_width = self.remote.goal_width
+            self.goal_height = self.remote.goal_height
+            self.settings.match_duration = self.remote.match_duration
+            kickoff = self.remote.kickoff()
+        
+        # Match events from the engine, optionally logged as JSON lines ("-" for stdout)
+        self.event_stream = EventStream()
+        self.event_log = JsonLinesSink(events, self.event_stream) if events else None
+        
+        # Physics runs in the headless match engine; this class only draws it
+        self.engine = MatchEngine(self.settings, field_radius=self.field_radius,
+                                  goal_width=self.goal_width, goal_height=self.goal_height,
+                                  center=(self.field_center_x, self.field_center_y), fps=self.fps,
+                                  kickoff=kickoff, stream=self.event_stream)
+        
+        # Optional recording of each match to a replay file
+        self.record_path = record
+        self.recorder = ReplayRecorder(record, self.engine) if record else None
         
         # Create teams
         self.teams = [
-            Team(self.settings.team1_name, "team1_logo.png", 
-                 [self.field_center_x - 40, self.field_center_y], 
-                 [0, -3], self.RED, 30),
-            
-            Team(self.settings.team2_name, "team2_logo.png", 
-                 [self.field_center_x + 40, self.field_center_y],
-                 [0, 3], self.BLUE, 30)
+            Team(self.team_name(i), self.team_logo(i), state, self.team_color(i), self.team_letter(i))
+            for i, state in enumerate(self.engine.teams)
         ]
         
+        # Cache of pre-rendered field sprites
+        self.field_renderer = FieldRenderer(self.WHITE)
+        self.field_renderer.set_geometry(self.field_radius, self.goal_width, self.goal_height)
+        
         # Create UI manager
         self.ui = UI(self.screen, self.WIDTH, self.HEIGHT)
         
+        # Optional renderer that only pushes changed regions to the display
+        self.renderer = DirtyRectRenderer(self) if dirty_rects else None
+        
+        # Optional per-phase timing of the game loop, shown in a HUD (F3)
+        self.profiler = FrameProfiler() if profile else None
+        if self.profiler:
+            self.profiler.show_hud = True
+        
         # Game state
         self.is_playing = False
-        self.game_time = 0  # in seconds
         self.scoring_team = None
         self.scoring_effect_timer = 0
         self.score_pulse_timer = 0
         self.show_settings = False
-        
+        self.frame_allocations = 0
+        
+        # Playback position in ticks when watching a replay
+        self.replay_tick = 0
+        
+        # Snapshots of the match for rewinding with the left arrow key
+        self.history = deque([self.snapshot()], maxlen=self.REWIND_HISTORY)
+        
+    def team_name(self, team_idx):
+        """Name of a team: from the settings for the first two, generated for the rest"""
+        if team_idx == 0:
+            return self.settings.team1_name
+        if team_idx == 1:
+            return self.settings.team2_name
+        if team_idx < 26:
+            return f"Team {chr(ord('A') + team_idx)}"
+        return f"Team {team_idx + 1}"
+    
+    def team_letter(self, team_idx):
+        """Letter on a team's fallback logo: A, B, ... by position, then numbers"""
+        if team_idx < 26:
+            return chr(ord('A') + team_idx)
+        return str(team_idx + 1)
+    
+    def team_logo(self, team_idx):
+        """Logo file of a team: the club's own if it has one, else team1_logo.png and so on"""
+        if self.clubs and self.clubs[team_idx].logo:
+            return self.clubs[team_idx].logo
+        return f"team{team_idx + 1}_logo.png"
+    
+    def team_color(self, team_idx):
+        """Colour of a team: red and blue for the first two, spread hues for the rest"""
+        if team_idx == 0:
+            return self.RED
+        if team_idx == 1:
+            return self.BLUE
+        color = pygame.Color(0)
+        color.hsva = ((team_idx * 137.5) % 360, 80, 95, 100)
+        return (color.r, color.g, color.b)
+    
+    @property
+    def rotation(self):
+        """Current goal rotation in degrees"""
+        return self.engine.rotation
+    
+    @property
+    def game_time(self):
+        """Elapsed match time in seconds"""
+        return self.engine.game_time
+    
     def draw_field(self):
         """Draw the playing field with rotating goal"""
         # Fill background
         self.screen.fill(self.PURPLE)
         
-        # Convert rotation to radians
-        rotation_rad = math.radians(self.rotation)
-        
-        # Calculate goal position
-        goal_angle_rad = math.radians(self.goal_width / (2 * self.field_radius) * 180 / math.pi)
-        
-        # Draw the main circle arc (everything except the goal opening)
-        points = []
-        num_points = 100
-        start_angle = goal_angle_rad
-        end_angle = 2 * math.pi - goal_angle_rad
-        
-        for i in range(num_points + 1):
-            angle = start_angle + (end_angle - start_angle) * i / num_points
-            rotated_angle = angle + rotation_rad
-            x = self.field_center_x + self.field_radius * math.cos(rotated_angle)
-            y = self.field_center_y + self.field_radius * math.sin(rotated_angle)
-            points.append((x, y))
-        
-        # Draw the circle arc
-        if len(points) > 1:
-            pygame.draw.lines(self.screen, self.WHITE, False, points, 2)
-        
-        # Draw goal posts
-        goal_left_angle = rotation_rad - goal_angle_rad
-        goal_right_angle = rotation_rad + goal_angle_rad
-        
-        goal_left_inner = (
-            self.field_center_x + self.field_radius * math.cos(goal_left_angle),
-            self.field_center_y + self.field_radius * math.sin(goal_left_angle)
-        )
-        
-        goal_right_inner = (
-            self.field_center_x + self.field_radius * math.cos(goal_right_angle),
-            self.field_center_y + self.field_radius * math.sin(goal_right_angle)
-        )
-        
-        goal_left_outer = (
-            self.field_center_x + (self.field_radius + self.goal_height) * math.cos(goal_left_angle),
-            self.field_center_y + (self.field_radius + self.goal_height) * math.sin(goal_left_angle)
-        )
-        
-        goal_right_outer = (
-            self.field_center_x + (self.field_radius + self.goal_height) * math.cos(goal_right_angle),
-            self.field_center_y + (self.field_radius + self.goal_height) * math.sin(goal_right_angle)
-        )
-        
-        # Draw goal (left post, right post, back)
-        pygame.draw.line(self.screen, self.WHITE, goal_left_inner, goal_left_outer, 2)
-        pygame.draw.line(self.screen, self.WHITE, goal_right_inner, goal_right_outer, 2)
-        pygame.draw.line(self.screen, self.WHITE, goal_left_outer, goal_right_outer, 2)
+        # Blit the pre-rendered arc and goal for the current rotation
+        self.field_renderer.draw(self.screen, self.rotation,
+                                 (self.field_center_x, self.field_center_y),
+                                 self.field_radius, self.goal_width, self.goal_height)
     
     def draw_teams(self):
         """Draw teams on the field"""
@@ -132,284 +209,378 @@ class FootballSimulator:
     def draw_scoring_effect(self):
         """Draw scoring effect overlay"""
         if self.scoring_effect_timer > 0:
-            # Create transparent overlay
-            overlay = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
-            
             # Team color with alpha
             alpha = int(100 * math.sin(self.scoring_effect_timer * 10))
             # Ensure alpha is in valid range
             alpha = max(0, min(255, alpha))
             
-            if self.scoring_team == 0:
-                # Using explicit RGBA tuple for overlay
-                overlay.fill((self.RED[0], self.RED[1], self.RED[2], alpha))
-            else:
-                # Using explicit RGBA tuple for overlay
-                overlay.fill((self.BLUE[0], self.BLUE[1], self.BLUE[2], alpha))
-                
-            self.screen.blit(overlay, (0, 0))
+            # Tint with the scoring team's reusable overlay
+            self.ui.overlays.blit(self.screen, self.teams[self.scoring_team].color, alpha)
     
-    def check_goal(self, team_idx):
-        """Check if a team has scored a goal"""
-        team = self.teams[team_idx]
-        
-        # Convert team position to polar coordinates relative to field center
-        dx = team.pos[0] - self.field_center_x
-        dy = team.pos[1] - self.field_center_y
-        dist_from_center = math.sqrt(dx*dx + dy*dy)
+    def update(self):
+        """Advance the match by one physics tick"""
+        if self.is_playing:
+            # Advance the shared match engine by one tick
+            goals = self.engine.step()
+            if self.recorder:
+                self.recorder.record_step(goals)
+            
+            for goal in goals:
+                # Trigger scoring effects
+                self.scoring_team = goal.team
+                self.scoring_effect_timer = 1.0  # One second
+                self.score_pulse_timer = 1.0
+            
+            # Keep a snapshot every match second to rewind to
+            if self.engine.tick % self.fps == 0:
+                self.history.append(self.snapshot())
+            
+            # Check if match is over
+            if self.engine.finished:
+                self.is_playing = False
+                if self.recorder:
+                    # Closed but kept, so a rewind can reopen it
+                    self.recorder.close()
+    
+    def advance(self, dt):
+        """Run the physics ticks owed for dt seconds of wall time
+        
+        Returns False if the frame budget ran out before the simulation caught up.
+        """
+        if self.remote:
+            # A live match runs on the server whether or not we are paused
+            self.follow_remote()
+            return True
         
-        # Calculate angle in the rotated frame
-        team_angle = math.degrees(math.atan2(dy, dx))
-        relative_angle = (team_angle - self.rotation + 360) % 360
+        if not self.is_playing:
+            self.accumulator = 0
+            return True
         
-        # Calculate half goal angle in degrees
-        half_goal_angle = (self.goal_width / (2 * self.field_radius)) * (180 / math.pi)
+        if self.replay:
+            self.advance_replay(dt)
+            return True
         
-        # Check if team is near or beyond boundary
-        is_near_boundary = dist_from_center >= self.field_radius - team.size/2
+        # Bank scaled wall time, but never more than a quarter second's worth,
+        # so a stalled window cannot queue up an endless catch-up
+        tick_length = 1 / self.fps
+        self.accumulator = min(self.accumulator + dt * self.time_scale,
+                               0.25 * self.time_scale + tick_length)
         
-        # Check if team is in goal area (angle near 0 degrees in rotated frame)
-        in_goal_angle = relative_angle > 360 - half_goal_angle or relative_angle < half_goal_angle
+        deadline = time.perf_counter() + tick_length
+        while self.accumulator >= tick_length and self.is_playing:
+            self.update()
+            self.accumulator -= tick_length
+            if time.perf_counter() > deadline:
+                break
         
-        # Check if team is exiting through goal
-        if is_near_boundary and in_goal_angle:
-            # Other team scores
-            other_team = 1 if team_idx == 0 else 0
-            self.teams[other_team].score += 1
-            
-            print(f"GOAL! Team {other_team} scores! New score: {self.teams[0].score}-{self.teams[1].score}")
-            
-            # Trigger scoring effects
-            self.scoring_team = other_team
-            self.scoring_effect_timer = 1.0  # One second
+        return self.accumulator < tick_length or not self.is_playing
+    
+    def show_frame(self, frame):
+        """Put a recorded or received state into the engine, which the view draws"""
+        self.engine.tick = frame.tick
+        self.engine.rotation = frame.rotation
+        for state, pos, vel, score in zip(self.engine.teams, frame.positions, frame.velocities, frame.score):
+            state.pos[0] = self.field_center_x + pos[0]
+            state.pos[1] = self.field_center_y + pos[1]
+            state.vel[0], state.vel[1] = vel
+            state.score = score
+    
+    def show_replay_tick(self, tick):
+        """Show the recorded state of a replay tick"""
+        self.show_frame(self.replay.frame(tick))
+        self.engine.finished = tick == len(self.replay) - 1
+    
+    def follow_remote(self):
+        """Show the latest state from the broadcast server, with effects for new goals"""
+        before = self.engine.score
+        if not self.remote.poll():
+            return
+        
+        frame = self.remote.frame()
+        self.show_frame(frame)
+        self.engine.finished = self.game_time >= self.settings.match_duration
+        
+        gains = [after - earlier for after, earlier in zip(frame.score, before)]
+        if max(gains) > 0:
+            self.scoring_team = gains.index(max(gains))
+            self.scoring_effect_timer = 1.0
             self.score_pulse_timer = 1.0
-            
-            # Return the team to the center with a random velocity
-            self.respawn_team(team_idx)
-            
-            return True
-        
-        return False
     
-    def respawn_team(self, team_idx):
-        """Reset team position after scoring"""
-        team = self.teams[team_idx]
-        
-        # Set position near center with random offset
-        offset_x = random.uniform(-20, 20)
-        offset_y = random.uniform(-20, 20)
-        team.pos = [
-            self.field_center_x + offset_x,
-            self.field_center_y + offset_y
-        ]
-        
-        # Give a random velocity
-        angle = random.uniform(0, 2 * math.pi)
-        speed = random.uniform(2, 4)
-        team.vel = [
-            speed * math.cos(angle),
-            speed * math.sin(angle)
-        ]
+    def advance_replay(self, dt):
+        """Play the replay forward by dt seconds of scaled wall time"""
+        last_tick = len(self.replay) - 1
+        previous = int(self.replay_tick)
+        self.replay_tick = min(self.replay_tick + dt * self.fps * self.time_scale, last_tick)
+        tick = int(self.replay_tick)
+        
+        # Show the effects of goals in the ticks just played
+        for goal_tick in range(previous + 1, tick + 1):
+            if self.replay.frame(goal_tick).events:
+                before = self.replay.frame(goal_tick - 1).score
+                after = self.replay.frame(goal_tick).score
+                self.scoring_team = max(range(len(after)), key=lambda i: after[i] - before[i])
+                self.scoring_effect_timer = 1.0
+                self.score_pulse_timer = 1.0
+        
+        self.show_replay_tick(tick)
+        if tick == last_tick:
+            self.is_playing = False
     
-    def handle_collision(self, team_idx):
-        """Handle collision with boundary and other team"""
-        team = self.teams[team_idx]
-        
-        # Get position and velocity
-        x, y = team.pos
-        vx, vy = team.vel
-        
-        # Calculate distance from center
-        dx = x - self.field_center_x
-        dy = y - self.field_center_y
-        dist = math.sqrt(dx*dx + dy*dy)
-        
-        # Check if team is near boundary
-        if dist > self.field_radius - team.size/2:
-            # First check if this is a goal
-            if self.check_goal(team_idx):
-                # If it's a goal, we've already handled everything
-                return
-            
-            # If not a goal, handle normal boundary collision
-            # Calculate angle of collision
-            angle = math.atan2(dy, dx)
-            
-            # Calculate incoming angle
-            vel_angle = math.atan2(vy, vx)
-            
-            # Calculate reflection angle
-            reflection_angle = 2 * angle - vel_angle - math.pi
-            
-            # Calculate new velocity
-            speed = math.sqrt(vx*vx + vy*vy)
-            team.vel = [
-                speed * math.cos(reflection_angle),
-                speed * math.sin(reflection_angle)
-            ]
-            
-            # Move team inside boundary
-            team.pos = [
-                self.field_center_x + (self.field_radius - team.size/2 - 1) * math.cos(angle),
-                self.field_center_y + (self.field_radius - team.size/2 - 1) * math.sin(angle)
-            ]
-        
-        # Check for collision with other team
-        other_idx = 1 if team_idx == 0 else 0
-        other_team = self.teams[other_idx]
-        
-        dx = team.pos[0] - other_team.pos[0]
-        dy = team.pos[1] - other_team.pos[1]
-        dist = math.sqrt(dx*dx + dy*dy)
-        
-        if dist < team.size:
-            # Calculate angle between teams
-            angle = math.atan2(dy, dx)
-            
-            # Calculate speeds
-            team_speed = math.sqrt(team.vel[0]**2 + team.vel[1]**2)
-            other_speed = math.sqrt(other_team.vel[0]**2 + other_team.vel[1]**2)
-            
-            # Exchange velocities (with angle)
-            team.vel = [
-                other_speed * math.cos(angle),
-                other_speed * math.sin(angle)
-            ]
-            
-            other_team.vel = [
-                -team_speed * math.cos(angle),
-                -team_speed * math.sin(angle)
-            ]
-            
-            # Separate teams
-            overlap = team.size - dist
-            if overlap > 0:
-                team.pos[0] += overlap/2 * math.cos(angle)
-                team.pos[1] += overlap/2 * math.sin(angle)
-                other_team.pos[0] -= overlap/2 * math.cos(angle)
-                other_team.pos[1] -= overlap/2 * math.sin(angle)
+    def scrub(self, ticks):
+        """Jump the replay by a number of ticks, backwards if negative"""
+        self.replay_tick = max(0, min(int(self.replay_tick) + ticks, len(self.replay) - 1))
+        self.scoring_effect_timer = 0
+        self.score_pulse_timer = 0
+        self.show_replay_tick(int(self.replay_tick))
     
-    def update(self):
-        """Update game state"""
-        # Rotate field
-        if self.is_playing:
-            self.rotation = (self.rotation + self.settings.rotation_speed) % 360
-            
-            # Update game time (seconds)
-            if pygame.time.get_ticks() % 1000 < 20:  # Approximately every second
-                self.game_time += 1
-                
-                # Check if match is over
-                if self.game_time >= self.settings.match_duration:
-                    self.is_playing = False
-                    print(f"MATCH OVER! Final score: {self.teams[0].score}-{self.teams[1].score}")
-        
-        # Update teams
-        for i, team in enumerate(self.teams):
-            if self.is_playing:
-                # Move team
-                team.pos[0] += team.vel[0]
-                team.pos[1] += team.vel[1]
-                
-                # Handle collisions (which now also checks for goals)
-                self.handle_collision(i)
-        
-        # Update timers
+    def snapshot(self):
+        """Capture the match, including the engine's RNG, and the scoring effects"""
+        return GameSnapshot(self.engine.snapshot(), self.scoring_team, self.scoring_effect_timer,
+                            self.score_pulse_timer)
+    
+    def restore(self, snapshot):
+        """Return the match and the scoring effects to a snapshot"""
+        self.engine.restore(snapshot.engine)
+        self.scoring_team = snapshot.scoring_team
+        self.scoring_effect_timer = snapshot.scoring_effect_timer
+        self.score_pulse_timer = snapshot.score_pulse_timer
+        self.accumulator = 0
+        if self.renderer:
+            self.renderer.invalidate()
+    
+    def rewind(self, seconds=1):
+        """Go back at least `seconds` of match time to the latest snapshot before then"""
+        target = self.engine.tick - seconds * self.fps
+        while len(self.history) > 1 and self.history[-1].engine.values[0] > target:
+            self.history.pop()
+        self.restore(self.history[-1])
+        
+        # The recording carries on from the rewound tick, so it matches what was watched
+        if self.recorder:
+            self.recorder.rewind(self.engine.tick)
+    
+    def update_effects(self, dt):
+        """Count down the scoring effect timers by dt seconds of wall time"""
         if self.scoring_effect_timer > 0:
-            self.scoring_effect_timer -= 1/60  # Decrement based on FPS
+            self.scoring_effect_timer -= dt
             if self.scoring_effect_timer <= 0:
                 self.scoring_effect_timer = 0
         
         if self.score_pulse_timer > 0:
-            self.score_pulse_timer -= 1/60
+            self.score_pulse_timer -= dt
             if self.score_pulse_timer <= 0:
                 self.score_pulse_timer = 0
-                
+    
+    def cycle_time_scale(self):
+        """Switch to the next simulation speed"""
+        time_scales = self.REPLAY_TIME_SCALES if self.replay else self.TIME_SCALES
+        index = time_scales.index(self.time_scale) if self.time_scale in time_scales else -1
+        self.time_scale = time_scales[(index + 1) % len(time_scales)]
+        
     def reset_game(self):
         """Reset the game to initial state"""
-        # Reset teams
-        self.teams[0].pos = [self.field_center_x - 40, self.field_center_y]
-        self.teams[0].vel = [0, -3]
-        self.teams[0].score = 0
-        
-        self.teams[1].pos = [self.field_center_x + 40, self.field_center_y]
-        self.teams[1].vel = [0, 3]
-        self.teams[1].score = 0
+        # Reset teams, score and clock
+        self.engine.reset()
         
         # Reset game state
-        self.rotation = 0
-        self.game_time = 0
         self.is_playing = False
+        self.accumulator = 0
         self.scoring_team = None
         self.scoring_effect_timer = 0
         self.score_pulse_timer = 0
+        
+        if self.replay:
+            # Rewind the replay to kickoff
+            self.replay_tick = 0
+            self.show_replay_tick(0)
+        elif self.remote:
+            # The live match carries on; show where it is now
+            self.show_frame(self.remote.frame())
+        elif self.record_path:
+            # Each new match overwrites the recording
+            if self.recorder:
+                self.recorder.close()
+            self.recorder = ReplayRecorder(self.record_path, self.engine)
+        
+        # Rewinding stops at the new kickoff
+        self.history.clear()
+        self.history.append(self.snapshot())
     
     def handle_events(self):
         """Handle all pygame events"""
         for event in pygame.event.get():
             if event.type == QUIT:
+                # Write out any events still queued for the log
+                if self.event_log:
+                    self.event_log.close()
                 pygame.quit()
                 sys.exit()
             
             if event.type == MOUSEBUTTONDOWN:
                 if self.show_settings:
                     # Handle clicks in settings menu
-                    settings_areas = self.ui.draw_settings_menu(self.settings)
-                    if self.ui.check_settings_click(event.pos, settings_areas, self.settings, self.teams):
+                    if self.ui.check_settings_click(event.pos, self.ui.settings_areas(), self.settings, self.teams):
                         self.show_settings = False
                 elif self.game_time >= self.settings.match_duration:
                     # Handle end screen button clicks
-                    play_again_button = self.ui.draw_match_end_screen(self.teams, self.game_time, self.settings)
-                    if play_again_button and play_again_button.collidepoint(event.pos):
+                    if self.ui.hit_test("end", event.pos) == "play_again":
                         self.reset_game()
                 else:
                     # Check if buttons were clicked
-                    buttons = self.ui.draw_buttons(self.is_playing)
-                    if buttons["play"].collidepoint(event.pos):
+                    button = self.ui.hit_test("buttons", event.pos)
+                    if button == "play":
                         self.is_playing = not self.is_playing
-                    elif buttons["reset"].collidepoint(event.pos):
+                    elif button == "reset":
                         self.reset_game()
-                    elif buttons["settings"].collidepoint(event.pos):
+                    elif button == "settings":
                         self.show_settings = True
             
             # Also handle mouse movement for slider dragging
             if event.type == MOUSEMOTION and self.show_settings and self.settings.slider_dragging:
-                settings_areas = self.ui.draw_settings_menu(self.settings)
-                self.ui.check_settings_click(event.pos, settings_areas, self.settings, self.teams)
+                self.ui.check_settings_click(event.pos, self.ui.settings_areas(), self.settings, self.teams)
             
             if event.type == MOUSEBUTTONUP and self.settings.slider_dragging:
                 self.settings.slider_dragging = False
             
             if event.type == KEYDOWN:
+                if event.key == K_t and self.settings.active_setting is None:
+                    self.cycle_time_scale()
+                if self.profiler and event.key == K_F3:
+                    self.profiler.show_hud = not self.profiler.show_hud
+                    if self.renderer:
+                        self.renderer.invalidate()
+                if self.profiler and event.key == K_F4:
+                    path = self.profiler.dump_trace(time.strftime("trace-%Y%m%d-%H%M%S.json"))
+                    print(f"Wrote frame trace to {path}")
+                if self.replay and self.settings.active_setting is None:
+                    # Scrub by a second with the arrow keys, or a single tick with , and .
+                    if event.key == K_LEFT:
+                        self.scrub(-self.fps)
+                    elif event.key == K_RIGHT:
+                        self.scrub(self.fps)
+                    elif event.key == K_COMMA:
+                        self.scrub(-1)
+                    elif event.key == K_PERIOD:
+                        self.scrub(1)
+                elif event.key == K_LEFT and self.settings.active_setting is None and not self.remote:
+                    # Rewind a live match by a second
+                    self.rewind()
                 self.ui.handle_key_events(event, self.settings, self.teams)
+            
+            # Window contents were lost, so the next frame must be presented in full
+            if event.type == VIDEOEXPOSE and self.renderer:
+                self.renderer.invalidate()
+    
+    def allocation_counts(self):
+        """Surfaces created so far by each cache that draws frames"""
+        return {
+            "overlays": self.ui.overlays.allocations,
+            "text": self.ui.text.misses,
+            "field_sprites": self.field_renderer.misses,
+        }
+    
+    def draw_frame(self):
+        """Draw everything for the current frame onto the screen surface
+        
+        The number of surfaces it allocated is kept in `frame_allocations`.
+        """
+        before = sum(self.allocation_counts().values())
+        regions = {}
+        profiler = self.profiler
+        if profiler:
+            start = time.perf_counter()
+        
+        # Draw everything
+        self.draw_field()
+        if profiler:
+            field_end = time.perf_counter()
+            profiler.record("draw_field", start, field_end)
+        
+        self.draw_teams()
+        if profiler:
+            teams_end = time.perf_counter()
+            profiler.record("draw_teams", field_end, teams_end)
+        
+        # Draw UI elements based on game state
+        if self.show_settings:
+            self.ui.draw_settings_menu(self.settings)
+        elif self.game_time >= self.settings.match_duration:
+            self.ui.draw_match_end_screen(self.teams, self.game_time, self.settings)
+        else:
+            # The clock shows whole seconds, so its text is re-rendered once a second
+            regions = self.ui.draw_scoreboard(self.teams, int(self.game_time), self.settings, self.score_pulse_timer)
+            self.ui.draw_buttons(self.is_playing)
+            if self.time_scale != 1:
+                self.ui.draw_time_scale(self.time_scale)
+        
+        # Draw scoring effect on top of everything
+        self.draw_scoring_effect()
+        
+        if profiler:
+            ui_end = time.perf_counter()
+            profiler.record("ui", teams_end, ui_end)
+            if profiler.show_hud:
+                profiler.draw_hud(self.screen)
+                profiler.record("hud", ui_end, time.perf_counter())
+        
+        self.frame_allocations = sum(self.allocation_counts().values()) - before
+        return regions
+    
+    def present_display(self, rects=None):
+        """Show the drawn frame in the window: all of it, or only the given rects"""
+        profiler = self.profiler
+        if profiler:
+            start = time.perf_counter()
+        
+        # The HUD is not part of any dirty region, so show the whole frame with it
+        if rects is None or (profiler and profiler.show_hud):
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        
+        if profiler:
+            profiler.record("present", start, time.perf_counter())
     
     def run(self):
         """Main game loop"""
         running = True
+        dt = 0
+        skipped_frames = 0
+        profiler = self.profiler
         
         while running:
+            if profiler:
+                frame_start = time.perf_counter()
+            
             # Handle events
             self.handle_events()
+            if profiler:
+                events_end = time.perf_counter()
+                profiler.record("events", frame_start, events_end)
             
-            # Update game state
-            self.update()
+            # Run the physics ticks owed since the last frame
+            caught_up = self.advance(dt)
+            self.update_effects(dt)
+            if profiler:
+                profiler.record("update", events_end, time.perf_counter())
             
-            # Draw everything
-            self.draw_field()
-            self.draw_teams()
-            
-            # Draw UI elements based on game state
-            if self.show_settings:
-                self.ui.draw_settings_menu(self.settings)
-            elif self.game_time >= self.settings.match_duration:
-                self.ui.draw_match_end_screen(self.teams, self.game_time, self.settings)
+            # When the simulation is behind, spend the time on physics instead of
+            # drawing, but still draw a few times a second so the window responds
+            if caught_up or skipped_frames >= self.fps // 4:
+                skipped_frames = 0
+                if self.renderer:
+                    # Redraw and present only what changed
+                    self.renderer.present()
+                else:
+                    self.draw_frame()
+                    self.present_display()
             else:
-                self.ui.draw_scoreboard(self.teams, self.game_time, self.settings, self.score_pulse_timer)
-                self.ui.draw_buttons(self.is_playing)
+                skipped_frames += 1
             
-            # Draw scoring effect on top of everything
-            self.draw_scoring_effect()
-            
-            # Update display and control frame rate
-            pygame.display.flip()
-            self.clock.tick(self.fps)
\ No newline at end of file
+            # Control frame rate
+            if profiler:
+                sleep_start = time.perf_counter()
+            dt = self.clock.tick(self.fps) / 1000
+            if profiler:
+                profiler.record("sleep", sleep_start, time.perf_counter())
+                profiler.end_frame()
@@ -2,13 +2,70 @@
 Football Simulator Main File
 Run this file to start the game.
 """
+import argparse
 import pygame
 import sys
 from game import FootballSimulator
 
 def main():
+    parser = argparse.ArgumentParser(description="Football Simulator")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw and present the screen regions that changed")
+    parser.add_argument("--speed", type=int, default=1, choices=FootballSimulator.TIME_SCALES,
+                        help="simulation speed; press T in game to change it")
+    parser.add_argument("--teams", type=int, default=2,
+                        help="number of teams on the field (more than two plays a free-for-all)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record each match to a replay file (a new match overwrites it)")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="watch a recorded match; arrow keys scrub, T cycles slow motion")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each phase of the game loop; F3 toggles the HUD, F4 writes a trace")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="watch the live match of a broadcast server (python broadcast.py)")
+    parser.add_argument("--clubs", metavar="PATH",
+                        help="JSON list of tournament clubs (see tournament.py) to pick the teams from")
+    parser.add_argument("--fixture", metavar="HOME,AWAY",
+                        help="names of the two clubs to play with --clubs (default: the first two)")
+    parser.add_argument("--events", metavar="PATH",
+                        help="log match events as JSON lines to PATH (- for stdout)")
+    args = parser.parse_args()
+    
+    connect = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        connect = (host or "127.0.0.1", int(port))
+    
+    if args.teams < 2:
+        parser.error("--teams must be at least 2")
+    
+    clubs = None
+    if args.fixture and not args.clubs:
+        parser.error("--fixture needs --clubs")
+    if args.clubs:
+        if args.teams != 2:
+            parser.error("--clubs plays a two-team match; leave out --teams")
+        
+        # Only needed here; the tournament module pulls in the batch tools
+        from tournament import load_clubs
+        clubs = load_clubs(args.clubs)
+        if args.fixture:
+            by_name = {club.name: club for club in clubs}
+            names = [name.strip() for name in args.fixture.split(",")]
+            if len(names) != 2 or names[0] == names[1]:
+                parser.error("--fixture takes two different club names: HOME,AWAY")
+            try:
+                clubs = [by_name[name] for name in names]
+            except KeyError as error:
+                parser.error(f"no club named {error} in {args.clubs}")
+        elif len(clubs) < 2:
+            parser.error(f"{args.clubs} needs at least two clubs")
+    
     # Create and run the game
-    game = FootballSimulator()
+    game = FootballSimulator(dirty_rects=args.dirty_rects, time_scale=args.speed,
+                             num_teams=args.teams, record=args.record, replay=args.replay,
+                             profile=args.profile, connect=connect, clubs=clubs,
+                             events=args.events)
     game.run()
 
 if __name__ == "__main__":
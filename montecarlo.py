@@ -0,0 +1,311 @@
+"""
+Monte Carlo Module
+Runs many seeded headless matches across worker processes.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import statistics
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import closing
+
+from engine import DEFAULT_KICKOFF, MatchEngine
+from event_engine import EVENT_DRIVEN_HELP, EventEngine
+from result_store import ResultStore, config_hash
+from settings import Settings
+
+# Result of a sequential estimate: the point estimate, its confidence interval,
+# the matches played and the wall time spent
+Estimate = namedtuple("Estimate", ["p", "low", "high", "matches", "wall_time", "converged", "stats"])
+
+def derive_seed(master_seed, index):
+    """Derive the seed of match `index` from the master seed"""
+    digest = hashlib.sha256(f"{master_seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+def play_matches(engine_class, settings, master_seed, start, stop, engine_kwargs, snapshot=None):
+    """Play matches start..stop-1 and return their results in order
+
+    With a snapshot, each match continues from it with its own seed.
+    """
+    results = []
+    for index in range(start, stop):
+        rng = random.Random(derive_seed(master_seed, index))
+        engine = engine_class(settings, rng=rng, **engine_kwargs)
+        if snapshot is not None:
+            engine.restore(snapshot, rng=False)
+        results.append(engine.run())
+    return results
+
+def submit_in_order(submit, items, window):
+    """Yield (item, submit(item)) in order, keeping `window` items submitted ahead
+
+    `submit` returns a Future, or a ready result when there is no work to do.
+    Only a bounded window of items is in flight, so memory stays flat however
+    many items there are. Futures still waiting when the caller stops early
+    are cancelled.
+    """
+    items = iter(items)
+    pending = deque()
+
+    def submit_next():
+        for item in items:
+            pending.append((item, submit(item)))
+            return
+
+    for _ in range(window):
+        submit_next()
+
+    try:
+        while pending:
+            item, submitted = pending.popleft()
+            # Top the window up before the caller waits on this item
+            submit_next()
+            yield item, submitted
+    finally:
+        for _, submitted in pending:
+            if isinstance(submitted, Future):
+                submitted.cancel()
+
+class MatchStats:
+    """Running aggregate of match results from the first team's point of view
+
+    With more than two teams, the first team wins by outscoring every other
+    team and draws when it ties for the top score.
+    """
+    def __init__(self, num_teams=2):
+        self.matches = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.goal_distribution = [Counter() for _ in range(num_teams)]
+
+    def add(self, result):
+        """Fold one MatchResult into the aggregate"""
+        self.matches += 1
+        home, away = result.score[0], max(result.score[1:])
+        if home > away:
+            self.wins += 1
+        elif home < away:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+        for counter, goals in zip(self.goal_distribution, result.score):
+            counter[goals] += 1
+
+    @property
+    def win_rate(self):
+        return self.wins / self.matches if self.matches else 0.0
+
+    @property
+    def draw_rate(self):
+        return self.draws / self.matches if self.matches else 0.0
+
+    @property
+    def loss_rate(self):
+        return self.losses / self.matches if self.matches else 0.0
+
+    def as_dict(self):
+        """Return the aggregate as plain data, e.g. for JSON output"""
+        return {
+            "matches": self.matches,
+            "win_rate": self.win_rate,
+            "draw_rate": self.draw_rate,
+            "loss_rate": self.loss_rate,
+            "goal_distribution": [
+                {goals: counter[goals] for goals in sorted(counter)}
+                for counter in self.goal_distribution
+            ],
+        }
+
+class MonteCarloRunner:
+    """Fans seeded matches out over a process pool
+
+    Match `i` always uses the seed derived from (master_seed, i) and results
+    are yielded in index order, so the output does not depend on the number
+    of workers. `engine_class` may be MatchEngine or EventEngine. Given a
+    MatchEngine `snapshot`, every match is a continuation of it instead of a
+    match from kickoff.
+    """
+    def __init__(self, settings=None, master_seed=0, workers=None, chunk_size=64,
+                 engine_class=MatchEngine, store=None, snapshot=None, **engine_kwargs):
+        self.engine_class = engine_class
+        self.settings = settings if settings is not None else Settings()
+        self.master_seed = master_seed
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.engine_kwargs = engine_kwargs
+        self.snapshot = snapshot
+
+        # Optional ResultStore; chunks it already holds are not played again
+        self.store = store
+        self.config = None
+        if store is not None:
+            self.config = config_hash(self.settings, engine_class, snapshot=snapshot, **engine_kwargs)
+
+    def chunks(self, count, first=0):
+        """Split match indices first..first+count-1 into (start, stop) chunks"""
+        stop = first + count
+        for start in range(first, stop, self.chunk_size):
+            yield start, min(start + self.chunk_size, stop)
+
+    def lookup(self, start, stop):
+        """Results of matches start..stop-1 from the store, or None unless it has them all"""
+        if self.store is None:
+            return None
+        seeds = [derive_seed(self.master_seed, index) for index in range(start, stop)]
+        found = self.store.get_many(self.config, seeds)
+        if len(found) < len(seeds):
+            return None
+        return [found[seed] for seed in seeds]
+
+    def save(self, start, batch):
+        """Add freshly played matches to the store"""
+        if self.store is not None:
+            self.store.put_many(self.config, [(derive_seed(self.master_seed, index), result)
+                                              for index, result in enumerate(batch, start)])
+
+    def results(self, count, first=0):
+        """Yield (index, MatchResult) pairs in index order as matches finish"""
+        if self.workers <= 1:
+            # Play in this process; no pickling or pool start-up cost
+            for start, stop in self.chunks(count, first):
+                batch = self.lookup(start, stop)
+                if batch is None:
+                    batch = play_matches(self.engine_class, self.settings, self.master_seed,
+                                         start, stop, self.engine_kwargs, self.snapshot)
+                    self.save(start, batch)
+                yield from enumerate(batch, start)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            def submit(chunk):
+                # Stored chunks are ready lists, the rest are played in the pool
+                batch = self.lookup(*chunk)
+                if batch is not None:
+                    return batch
+                return pool.submit(play_matches, self.engine_class, self.settings, self.master_seed,
+                                   chunk[0], chunk[1], self.engine_kwargs, self.snapshot)
+
+            # Closing cancels the queued chunks if the caller stops early
+            chunks = submit_in_order(submit, self.chunks(count, first), self.workers * 2)
+            with closing(chunks):
+                for (start, _), batch in chunks:
+                    if isinstance(batch, Future):
+                        batch = batch.result()
+                        self.save(start, batch)
+                    yield from enumerate(batch, start)
+
+    def run(self, count):
+        """Play `count` matches and return their MatchStats"""
+        stats = MatchStats(len(self.engine_kwargs.get("kickoff") or DEFAULT_KICKOFF))
+        for _, result in self.results(count):
+            stats.add(result)
+        return stats
+
+def branch(snapshot, count, settings=None, **runner_kwargs):
+    """Play `count` continuations of a MatchEngine snapshot in parallel; return their MatchResults
+
+    Pass the engine's settings and config() so the continuations play on
+    the same field, e.g. branch(engine.snapshot(), 1000, engine.settings,
+    **engine.config()). Each continuation gets its own seed, so they differ
+    from the match the snapshot came from and from each other.
+    """
+    runner = MonteCarloRunner(settings, snapshot=snapshot, **runner_kwargs)
+    return [result for _, result in runner.results(count)]
+
+def wilson_interval(successes, trials, z):
+    """Wilson score interval for a binomial proportion"""
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+class SequentialEstimator:
+    """Estimates P(first team wins) by playing matches until the interval is narrow enough
+
+    Matches come from a MonteCarloRunner in index order, so an estimate is
+    reproducible for a given master seed. After each match the Wilson
+    interval at `confidence` is updated; play stops once its half-width is
+    at most `precision` (and at least `min_matches` have been played), or
+    after `max_matches`. Because stopping depends only on the interval
+    width, lopsided configurations, whose variance is small, finish early.
+    """
+    def __init__(self, settings=None, precision=0.01, confidence=0.95, min_matches=100,
+                 max_matches=1000000, **runner_kwargs):
+        self.runner = MonteCarloRunner(settings, **runner_kwargs)
+        self.precision = precision
+        self.confidence = confidence
+        self.z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        self.min_matches = min_matches
+        self.max_matches = max_matches
+
+    def run(self, progress=None):
+        """Play until the estimate is precise enough and return an Estimate
+
+        `progress`, if given, is called as progress(matches, p, low, high)
+        after every match.
+        """
+        kickoff = self.runner.engine_kwargs.get("kickoff") or DEFAULT_KICKOFF
+        stats = MatchStats(len(kickoff))
+        low, high = 0.0, 1.0
+        converged = False
+        start = time.perf_counter()
+
+        for _, result in self.runner.results(self.max_matches):
+            stats.add(result)
+            low, high = wilson_interval(stats.wins, stats.matches, self.z)
+            if progress:
+                progress(stats.matches, stats.win_rate, low, high)
+            if stats.matches >= self.min_matches and (high - low) / 2 <= self.precision:
+                converged = True
+                break
+
+        return Estimate(stats.win_rate, low, high, stats.matches,
+                        time.perf_counter() - start, converged, stats)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run seeded headless matches and print outcome rates as JSON")
+    parser.add_argument("--matches", type=int, default=1000, help="number of matches to play")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--event-driven", action="store_true", help=EVENT_DRIVEN_HELP)
+    parser.add_argument("--precision", type=float, default=None,
+                        help="stop once P(first team wins) is known to +/- this; --matches becomes the limit")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level for --precision")
+    parser.add_argument("--store", metavar="PATH", help="SQLite file that caches match results between runs")
+    args = parser.parse_args()
+
+    engine_class = EventEngine if args.event_driven else MatchEngine
+    store = ResultStore(args.store) if args.store else None
+    if args.precision is not None:
+        estimator = SequentialEstimator(precision=args.precision, confidence=args.confidence,
+                                        max_matches=args.matches, master_seed=args.seed,
+                                        workers=args.workers, engine_class=engine_class, store=store)
+        estimate = estimator.run()
+        print(json.dumps({
+            "win_probability": estimate.p,
+            "interval": [estimate.low, estimate.high],
+            "confidence": args.confidence,
+            "matches": estimate.matches,
+            "wall_time": estimate.wall_time,
+            "converged": estimate.converged,
+            "stats": estimate.stats.as_dict(),
+        }, indent=2))
+        return
+
+    runner = MonteCarloRunner(master_seed=args.seed, workers=args.workers, engine_class=engine_class,
+                              store=store)
+    print(json.dumps(runner.run(args.matches).as_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Overlay Module
+Reusable full-screen tint surfaces for the scoring flash and the full-time screen.
+"""
+import pygame
+
+class OverlayPool:
+    """Tint surfaces keyed by (size, colour), built once and reused every frame
+
+    Each surface is opaque and in the display's pixel format; its transparency
+    comes from the surface alpha, which is set on every use instead of
+    allocating a new per-pixel-alpha surface for each frame.
+    """
+    def __init__(self):
+        self.surfaces = {}
+
+        # Counters for checking that steady-state frames allocate nothing
+        self.allocations = 0
+        self.uses = 0
+
+    def get(self, size, color, alpha):
+        """Return the overlay of the given size and colour, set to `alpha`"""
+        key = (tuple(size), tuple(color[:3]))
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(color[:3])
+            self.surfaces[key] = surface
+            self.allocations += 1
+
+        surface.set_alpha(alpha)
+        self.uses += 1
+        return surface
+
+    def blit(self, screen, color, alpha):
+        """Tint the whole screen with a colour at the given alpha"""
+        if alpha <= 0:
+            return
+        screen.blit(self.get(screen.get_size(), color, alpha), (0, 0))
+
+    def clear(self):
+        """Drop all overlays, e.g. after the display mode changed"""
+        self.surfaces.clear()
@@ -0,0 +1,120 @@
+"""
+Profiler Module
+Times each phase of the game loop and shows the results in an on-screen HUD.
+"""
+import json
+import os
+import time
+from array import array
+
+import pygame
+
+from text_cache import TextCache
+
+class FrameProfiler:
+    """Keeps the last `capacity` timings of every phase of the game loop in ring buffers
+
+    Phases are recorded with `record(phase, start, end)` using
+    time.perf_counter() values. Buffers are preallocated arrays, so recording
+    allocates nothing; the game only calls the profiler when one was created,
+    so an unprofiled game pays a single `if` per phase.
+    """
+    PHASES = ("events", "update", "draw_field", "draw_teams", "ui", "hud", "present", "sleep")
+
+    # Frames between refreshes of the HUD statistics
+    HUD_REFRESH = 30
+
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.starts = {phase: array("d", bytes(8 * capacity)) for phase in self.PHASES}
+        self.durations = {phase: array("d", bytes(8 * capacity)) for phase in self.PHASES}
+        self.counts = dict.fromkeys(self.PHASES, 0)
+        self.frames = 0
+        self.origin = time.perf_counter()
+
+        # HUD state
+        self.show_hud = False
+        self.text = TextCache(max_entries=64)
+        self.summary_cache = None
+
+    def record(self, phase, start, end):
+        """Store one timing of a phase"""
+        i = self.counts[phase] % self.capacity
+        self.starts[phase][i] = start
+        self.durations[phase][i] = end - start
+        self.counts[phase] += 1
+
+    def end_frame(self):
+        """Mark the end of a frame of the game loop"""
+        self.frames += 1
+        if self.frames % self.HUD_REFRESH == 0:
+            self.summary_cache = None
+
+    def samples(self, phase):
+        """Buffered durations of a phase in seconds, oldest first"""
+        count = self.counts[phase]
+        durations = self.durations[phase]
+        if count <= self.capacity:
+            return list(durations[:count])
+        i = count % self.capacity
+        return list(durations[i:]) + list(durations[:i])
+
+    def summary(self):
+        """Map each recorded phase to its (p50, p95, max) duration in milliseconds"""
+        stats = {}
+        for phase in self.PHASES:
+            samples = sorted(self.samples(phase))
+            if not samples:
+                continue
+            n = len(samples)
+            stats[phase] = (samples[n // 2] * 1000,
+                            samples[min(n - 1, int(n * 0.95))] * 1000,
+                            samples[-1] * 1000)
+        return stats
+
+    def draw_hud(self, screen, pos=(5, 130)):
+        """Draw p50/p95/max per phase; the figures refresh every HUD_REFRESH frames"""
+        if self.summary_cache is None:
+            self.summary_cache = self.summary()
+
+        rows = [("phase", "p50", "p95", "max")]
+        for phase, (p50, p95, peak) in self.summary_cache.items():
+            rows.append((phase, f"{p50:.2f}", f"{p95:.2f}", f"{peak:.2f}"))
+
+        row_height = 16
+        columns = (0, 80, 125, 170)
+        panel = pygame.Rect(pos[0], pos[1], 215, row_height * len(rows) + 6)
+        pygame.draw.rect(screen, (0, 0, 0), panel)
+
+        y_pos = pos[1] + 3
+        for row in rows:
+            for column, value in zip(columns, row):
+                text = self.text.render(value, 18, (255, 255, 0) if row is rows[0] else (255, 255, 255))
+                screen.blit(text, (pos[0] + 4 + column, y_pos))
+            y_pos += row_height
+        return panel
+
+    def trace_events(self):
+        """Buffered timings as Chrome trace events, in time order"""
+        events = []
+        for phase in self.PHASES:
+            count = min(self.counts[phase], self.capacity)
+            starts = self.starts[phase]
+            durations = self.durations[phase]
+            for i in range(count):
+                events.append({
+                    "name": phase,
+                    "ph": "X",
+                    "ts": (starts[i] - self.origin) * 1e6,
+                    "dur": durations[i] * 1e6,
+                    "pid": os.getpid(),
+                    "tid": 1,
+                })
+        events.sort(key=lambda event: event["ts"])
+        return events
+
+    def dump_trace(self, path):
+        """Write the buffered timings as a Chrome trace (load it in chrome://tracing or Perfetto)"""
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+        return path
@@ -0,0 +1,103 @@
+"""
+Renderer Module
+Presents only the parts of the screen that changed since the last frame.
+"""
+import math
+
+class DirtyRectRenderer:
+    """Draws a frame only when something visible changed and pushes just those regions
+
+    While the match is playing normally the changed regions are the two team
+    logos (old and new rects), the goal sector, the score and the clock. Screens
+    with a full-screen overlay (settings, full time, goal flash) are presented
+    whole whenever their contents change. A paused or finished match whose
+    state is unchanged is neither drawn nor presented.
+    """
+    def __init__(self, game):
+        self.game = game
+        self.invalidate()
+
+        # Counters for checking how much presenting was avoided
+        self.frames_skipped = 0
+        self.full_updates = 0
+        self.partial_updates = 0
+
+    def invalidate(self):
+        """Force the next frame to be drawn and presented in full"""
+        self.last_state = None
+        self.last_mode = None
+        self.last_team_rects = None
+        self.last_goal_slot = None
+        self.last_goal_rect = None
+        self.last_text = None
+        self.last_regions = {}
+
+    def capture(self):
+        """Return (mode, team rects, goal slot, goal rect, text state, extra state) for this frame"""
+        game = self.game
+        full_time = game.game_time >= game.settings.match_duration
+        flashing = game.scoring_effect_timer > 0
+        mode = (game.show_settings, full_time, game.is_playing, flashing, game.time_scale)
+
+        team_rects = [team.logo.get_rect(center=team.pos) for team in game.teams]
+        goal_slot = game.field_renderer.quantize(game.rotation)
+        goal_rect = game.field_renderer.goal_rect(game.rotation, (game.field_center_x, game.field_center_y))
+
+        # Everything that decides the scoreboard text
+        pulse_size = None
+        if game.score_pulse_timer > 0:
+            pulse_size = int(36 + 10 * math.sin(game.score_pulse_timer * 20))
+        text = (tuple(team.score for team in game.teams), tuple(team.name for team in game.teams),
+                int(game.game_time), pulse_size)
+
+        # The settings menu redraws on any edit; the flash changes every frame
+        settings = game.settings
+        extra = (settings.team1_name, settings.team2_name, settings.active_setting,
+                 settings.text_input, settings.rotation_speed, game.scoring_effect_timer)
+
+        return mode, team_rects, goal_slot, goal_rect, text, extra
+
+    def present(self):
+        """Draw and present the current frame if anything visible changed"""
+        mode, team_rects, goal_slot, goal_rect, text, extra = self.capture()
+        state = (mode, [tuple(rect) for rect in team_rects], goal_slot, text, extra)
+        if state == self.last_state:
+            self.frames_skipped += 1
+            return
+
+        regions = self.game.draw_frame()
+
+        overlay = mode[0] or mode[1] or mode[3]
+        if mode != self.last_mode or overlay:
+            self.game.present_display()
+            self.full_updates += 1
+        else:
+            rects = []
+
+            # Team logos: clear the old position and draw the new one
+            for old, new in zip(self.last_team_rects, team_rects):
+                if old != new:
+                    rects.append(old)
+                    rects.append(new)
+
+            # Goal sector
+            if goal_slot != self.last_goal_slot:
+                rects.append(self.last_goal_rect)
+                rects.append(goal_rect)
+
+            # Score and clock text
+            if text != self.last_text:
+                for name, rect in regions.items():
+                    old = self.last_regions.get(name)
+                    rects.append(rect.union(old) if old else rect)
+
+            self.game.present_display(rects)
+            self.partial_updates += 1
+
+        self.last_state = state
+        self.last_mode = mode
+        self.last_team_rects = team_rects
+        self.last_goal_slot = goal_slot
+        self.last_goal_rect = goal_rect
+        self.last_text = text
+        self.last_regions = regions
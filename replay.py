@@ -0,0 +1,171 @@
+"""
+Replay Module
+Records matches tick by tick to a compact binary file and plays them back.
+"""
+import mmap
+import random
+import struct
+from collections import namedtuple
+
+from engine import Goal, MatchEngine
+
+MAGIC = b"FSRP"
+VERSION = 1
+
+# Header: magic, version, team count, ticks per second, field radius, goal
+# width, goal height and match duration, followed by one byte per team for its size
+HEADER = struct.Struct("<4sBBHHHHf")
+
+# Fixed-point scales: positions in 1/64 px relative to the field centre,
+# velocities in 1/256 px per tick and the goal rotation in 1/128 degree
+POS_SCALE = 64
+VEL_SCALE = 256
+ROTATION_SCALE = 128
+
+# Event flags stored with each tick
+EVENT_GOAL = 1
+
+# State of the match after one tick; positions are relative to the field centre
+ReplayFrame = namedtuple("ReplayFrame", ["tick", "rotation", "positions", "velocities", "score", "events"])
+
+def record_struct(num_teams):
+    """Layout of one tick: rotation, event flags, then x, y, vx, vy and score per team"""
+    return struct.Struct("<HB" + "hhhh" * num_teams + "H" * num_teams)
+
+class ReplayRecorder:
+    """Appends the state of a MatchEngine to a replay file after every tick
+
+    Every tick takes the same number of bytes (23 for a two-team match, about
+    41 KB for a whole match), so a player can seek to any tick directly.
+    Tick 0, the kickoff, is written when the recorder is created.
+    """
+    def __init__(self, path, engine):
+        self.path = path
+        self.engine = engine
+        self.record = record_struct(len(engine.teams))
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, len(engine.teams), engine.fps,
+                                    engine.field_radius, engine.goal_width, engine.goal_height,
+                                    engine.settings.match_duration))
+        self.file.write(bytes(int(team.size) for team in engine.teams))
+        self.start = self.file.tell()
+        self.ticks = 0
+        self.write_tick(0)
+
+    def write_tick(self, events):
+        """Pack the engine's current state as one record"""
+        engine = self.engine
+        values = [int(round(engine.rotation * ROTATION_SCALE)) % (360 * ROTATION_SCALE), events]
+        for team in engine.teams:
+            values.append(int(round((team.pos[0] - engine.field_center_x) * POS_SCALE)))
+            values.append(int(round((team.pos[1] - engine.field_center_y) * POS_SCALE)))
+            values.append(int(round(team.vel[0] * VEL_SCALE)))
+            values.append(int(round(team.vel[1] * VEL_SCALE)))
+        values.extend(team.score for team in engine.teams)
+        self.file.write(self.record.pack(*values))
+        self.ticks += 1
+
+    def record_step(self, goals):
+        """Record the tick the engine just stepped, given the goals it returned"""
+        self.write_tick(EVENT_GOAL if goals else 0)
+
+    def rewind(self, tick):
+        """Drop the records after `tick`, reopening a closed recording, so it goes on from there"""
+        if self.file.closed:
+            self.file = open(self.path, "r+b")
+        self.ticks = min(self.ticks, tick + 1)
+        self.file.seek(self.start + self.ticks * self.record.size)
+        self.file.truncate()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ReplayPlayer:
+    """Reads a replay file through a memory map
+
+    Looking up a tick is a single unpack at a computed offset, so scrubbing to
+    any point of the match costs the same as stepping to the next tick.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, num_teams, fps, field_radius, goal_width, goal_height,
+         match_duration) = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported replay version {version}")
+
+        self.num_teams = num_teams
+        self.fps = fps
+        self.field_radius = field_radius
+        self.goal_width = goal_width
+        self.goal_height = goal_height
+        self.match_duration = match_duration
+        self.sizes = list(self.map[HEADER.size:HEADER.size + num_teams])
+
+        self.record = record_struct(num_teams)
+        self.offset = HEADER.size + num_teams
+
+        # A partly written last record is ignored
+        self.ticks = (len(self.map) - self.offset) // self.record.size
+
+    def __len__(self):
+        return self.ticks
+
+    def frame(self, tick):
+        """Return the ReplayFrame for a tick"""
+        if not 0 <= tick < self.ticks:
+            raise IndexError(f"Tick {tick} is outside the replay (0-{self.ticks - 1})")
+
+        values = self.record.unpack_from(self.map, self.offset + tick * self.record.size)
+        n = self.num_teams
+        teams = values[2:2 + 4 * n]
+        positions = [(teams[4*i] / POS_SCALE, teams[4*i + 1] / POS_SCALE) for i in range(n)]
+        velocities = [(teams[4*i + 2] / VEL_SCALE, teams[4*i + 3] / VEL_SCALE) for i in range(n)]
+        return ReplayFrame(tick, values[0] / ROTATION_SCALE, positions, velocities,
+                           values[2 + 4 * n:], values[1])
+
+    def kickoff(self):
+        """Kickoff layout of the recorded match, for building an engine to show it"""
+        first = self.frame(0)
+        return [(pos, vel, size) for pos, vel, size in zip(first.positions, first.velocities, self.sizes)]
+
+    def goals(self):
+        """Goal timeline of the replay, rebuilt from the score after each goal tick"""
+        goals = []
+        score = (0,) * self.num_teams
+        for tick in range(self.ticks):
+            # The event flags are the third byte of each record
+            if not self.map[self.offset + tick * self.record.size + 2] & EVENT_GOAL:
+                continue
+            new_score = self.frame(tick).score
+            for team_idx in range(self.num_teams):
+                for _ in range(new_score[team_idx] - score[team_idx]):
+                    goals.append(Goal(tick / self.fps, team_idx, new_score))
+            score = new_score
+        return goals
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def record_match(path, settings=None, seed=None, **kwargs):
+    """Simulate one headless match, record it to path and return its MatchResult"""
+    engine = MatchEngine(settings, rng=random.Random(seed), **kwargs)
+    with ReplayRecorder(path, engine) as recorder:
+        while not engine.finished:
+            recorder.record_step(engine.step())
+    return engine.run()
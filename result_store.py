@@ -0,0 +1,163 @@
+"""
+Result Store Module
+SQLite cache of match results keyed by the full match configuration and seed.
+"""
+import hashlib
+import json
+import random
+import sqlite3
+import time
+
+from engine import ENGINE_VERSION, Goal, MatchEngine, MatchResult, physics_version
+from settings import Settings
+
+def config_hash(settings=None, engine_class=MatchEngine, snapshot=None, **engine_kwargs):
+    """Canonical hash of everything that decides a match apart from its seed
+
+    That is the simulated Settings fields, the field and goal geometry, the
+    tick rate, every team's kickoff position, velocity and size, the engine
+    class and its physics_version, plus the state continued from for branches
+    of a snapshot. Team names and other display-only settings are left out.
+    """
+    settings = settings if settings is not None else Settings()
+    engine = engine_class(settings, rng=random.Random(0), **engine_kwargs)
+    config = {
+        "engine": engine_class.__name__,
+        "version": physics_version(engine_class),
+        "rotation_speed": settings.rotation_speed,
+        "match_duration": settings.match_duration,
+        "center": [engine.field_center_x, engine.field_center_y],
+        "field_radius": engine.field_radius,
+        "goal_width": engine.goal_width,
+        "goal_height": engine.goal_height,
+        "fps": engine.fps,
+        "kickoff": [[list(offset), list(velocity), size] for offset, velocity, size in engine.kickoff],
+    }
+    if snapshot is not None:
+        config["snapshot"] = [list(snapshot.values), [[g.time, g.team, list(g.score)] for g in snapshot.goals]]
+    text = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def encode_result(result):
+    """MatchResult as compact JSON"""
+    return json.dumps([list(result.score), [[g.time, g.team, list(g.score)] for g in result.goals], result.ticks],
+                      separators=(",", ":"))
+
+def decode_result(text):
+    """MatchResult from the JSON written by encode_result"""
+    score, goals, ticks = json.loads(text)
+    return MatchResult(tuple(score), [Goal(t, team, tuple(after)) for t, team, after in goals], ticks)
+
+class ResultStore:
+    """Memoized match results in a local SQLite file
+
+    Rows are keyed by (configuration hash, seed), and the hash changes with
+    the engine source, so results of old physics are never read back. Each
+    row also records ENGINE_VERSION; rows from other versions are deleted
+    when the store is opened. Once more than `max_entries` results are
+    stored, the least recently used ones are evicted.
+    """
+    def __init__(self, path, max_entries=1000000):
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                config TEXT NOT NULL,
+                seed TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (config, seed)
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+
+        # Results simulated by other physics versions are no longer valid
+        self.db.execute("DELETE FROM results WHERE version != ?", (ENGINE_VERSION,))
+        self.db.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+        # Rows stored, kept up to date by put_many so it never has to count them
+        self.rows = len(self)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get_many(self, config, seeds):
+        """Return {seed: MatchResult} for the seeds already stored under config"""
+        found = {}
+        seeds = list(seeds)
+
+        # SQLite limits the number of parameters in one statement
+        for i in range(0, len(seeds), 500):
+            batch = [str(seed) for seed in seeds[i:i + 500]]
+            marks = ",".join("?" * len(batch))
+            rows = self.db.execute(
+                f"SELECT seed, result FROM results WHERE config = ? AND seed IN ({marks})",
+                [config] + batch)
+            for seed, text in rows:
+                found[int(seed)] = decode_result(text)
+
+        if found:
+            now = time.time()
+            self.db.executemany("UPDATE results SET last_used = ? WHERE config = ? AND seed = ?",
+                                [(now, config, str(seed)) for seed in found])
+            self.db.commit()
+        self.hits += len(found)
+        self.misses += len(seeds) - len(found)
+        return found
+
+    def put_many(self, config, results):
+        """Store (seed, MatchResult) pairs under config, evicting old rows past max_entries"""
+        now = time.time()
+        rows = [(ENGINE_VERSION, encode_result(result), now, config, str(seed)) for seed, result in results]
+
+        # Update the stored seeds first, so the insert's rowcount is the number of new rows
+        self.db.executemany("UPDATE results SET version = ?, result = ?, last_used = ? WHERE config = ? AND seed = ?",
+                            rows)
+        cursor = self.db.executemany(
+            "INSERT OR IGNORE INTO results (version, result, last_used, config, seed) VALUES (?, ?, ?, ?, ?)", rows)
+        self.rows += cursor.rowcount
+
+        excess = self.rows - self.max_entries
+        if excess > 0:
+            cursor = self.db.execute(
+                "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY last_used LIMIT ?)",
+                (excess,))
+            self.rows -= cursor.rowcount
+        self.db.commit()
+
+    def get(self, config, seed):
+        """Return the stored MatchResult for one seed, or None"""
+        return self.get_many(config, [seed]).get(seed)
+
+    def put(self, config, seed, result):
+        self.put_many(config, [(seed, result)])
+
+    def simulate(self, seeds, settings=None, engine_class=MatchEngine, **engine_kwargs):
+        """Return the MatchResult for each seed, simulating and storing only the missing ones"""
+        config = config_hash(settings, engine_class, **engine_kwargs)
+        seeds = list(seeds)
+        found = self.get_many(config, seeds)
+
+        new = []
+        for seed in seeds:
+            if seed not in found:
+                engine = engine_class(settings, rng=random.Random(seed), **engine_kwargs)
+                found[seed] = engine.run()
+                new.append((seed, found[seed]))
+        if new:
+            self.put_many(config, new)
+        return [found[seed] for seed in seeds]
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,257 @@
+"""
+Sweep Module
+Plays every combination of match parameters across worker processes and streams the results to disk.
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import DEFAULT_KICKOFF, MatchEngine, physics_version
+from event_engine import EVENT_DRIVEN_HELP, EventEngine
+from montecarlo import derive_seed, submit_in_order
+from settings import Settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Swept parameters, in the order their combinations are enumerated
+PARAMETERS = ("rotation_speed", "match_duration", "goal_width", "field_radius", "size")
+
+DEFAULTS = {
+    "rotation_speed": [0.5],
+    "match_duration": [30],
+    "goal_width": [40],
+    "field_radius": [130],
+    "size": [30],
+}
+
+# Columns of every results chunk
+COLUMNS = ("index", "seed") + PARAMETERS + ("score_a", "score_b")
+
+ENGINES = {"MatchEngine": MatchEngine, "EventEngine": EventEngine}
+
+# Field radius DEFAULT_KICKOFF is laid out for
+KICKOFF_RADIUS = 130
+
+def parse_values(spec):
+    """Values from "a,b,c" or an inclusive range "start:stop:step" """
+    if ":" in spec:
+        start, stop, step = (float(part) for part in spec.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) for i in range(count)]
+    return [float(value) for value in spec.split(",")]
+
+def combination(grid, combo_index):
+    """Parameter values of combination `combo_index`, the last parameter varying fastest"""
+    values = {}
+    for name in reversed(PARAMETERS):
+        options = grid[name]
+        combo_index, i = divmod(combo_index, len(options))
+        values[name] = options[i]
+    return values
+
+def sweep_kickoff(field_radius, size):
+    """DEFAULT_KICKOFF with its offsets scaled to the field radius and every team of `size`"""
+    scale = field_radius / KICKOFF_RADIUS
+    return [((x * scale, y * scale), velocity, size) for (x, y), velocity, _ in DEFAULT_KICKOFF]
+
+def check_kickoff(field_radius, size):
+    """Raise ValueError unless every team starts wholly inside the field"""
+    for (x, y), _, _ in sweep_kickoff(field_radius, size):
+        if math.hypot(x, y) + size / 2 >= field_radius:
+            raise ValueError(f"teams of size {size:g} do not fit on a field of radius {field_radius:g}")
+
+def play_sweep_chunk(grid, seeds_per_combo, master_seed, engine_name, start, stop):
+    """Play sweep matches start..stop-1 and return their rows"""
+    engine_class = ENGINES[engine_name]
+    rows = []
+    for index in range(start, stop):
+        params = combination(grid, index // seeds_per_combo)
+        settings = Settings()
+        settings.rotation_speed = params["rotation_speed"]
+        settings.match_duration = params["match_duration"]
+        kickoff = sweep_kickoff(params["field_radius"], params["size"])
+
+        seed = derive_seed(master_seed, index)
+        engine = engine_class(settings, rng=random.Random(seed), field_radius=params["field_radius"],
+                              goal_width=params["goal_width"], kickoff=kickoff)
+        score = engine.run().score
+        rows.append((index, seed) + tuple(params[name] for name in PARAMETERS) + score)
+    return rows
+
+class Sweep:
+    """Grid of parameter combinations x seeds, written to `directory` in chunks
+
+    Match `i` plays combination i // seeds with the seed derived from
+    (master_seed, i), so results do not depend on the worker count. Each chunk
+    of matches is written to its own file once complete (.npz with NumPy,
+    otherwise .csv), and chunks already on disk are skipped, so an
+    interrupted sweep resumes where it stopped. Only the chunks in flight are
+    held in memory.
+    """
+    def __init__(self, directory, grid=None, seeds=10, master_seed=0, chunk_size=1000,
+                 workers=None, engine_name="MatchEngine", file_format=None):
+        self.directory = directory
+        self.grid = dict(DEFAULTS)
+        self.grid.update(grid or {})
+        self.seeds = seeds
+        self.master_seed = master_seed
+        self.chunk_size = chunk_size
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.engine_name = engine_name
+        self.file_format = file_format or ("npz" if np is not None else "csv")
+        if self.file_format == "npz" and np is None:
+            raise RuntimeError("Writing .npz chunks needs NumPy; use the csv format instead")
+
+        self.combinations = 1
+        for name in PARAMETERS:
+            self.combinations *= len(self.grid[name])
+        self.total = self.combinations * seeds
+
+        # The tightest fit is the largest team on the smallest field
+        check_kickoff(min(self.grid["field_radius"]), max(self.grid["size"]))
+
+    def manifest(self):
+        """Everything that decides the sweep's results, saved next to them"""
+        return {
+            "grid": self.grid,
+            "seeds": self.seeds,
+            "master_seed": self.master_seed,
+            "chunk_size": self.chunk_size,
+            "engine": self.engine_name,
+            "engine_version": physics_version(ENGINES[self.engine_name]),
+            "format": self.file_format,
+        }
+
+    def prepare(self):
+        """Create the directory and manifest, or check that it matches the sweep being resumed"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "sweep.json")
+        if os.path.exists(path):
+            with open(path) as f:
+                if json.load(f) != json.loads(json.dumps(self.manifest())):
+                    raise ValueError(f"{self.directory} holds a different sweep; use a new directory")
+        else:
+            with open(path, "w") as f:
+                json.dump(self.manifest(), f, indent=2)
+
+    def chunk_path(self, start):
+        return os.path.join(self.directory, f"chunk_{start // self.chunk_size:06d}.{self.file_format}")
+
+    def pending_chunks(self):
+        """(start, stop) of every chunk not yet on disk"""
+        for start in range(0, self.total, self.chunk_size):
+            if not os.path.exists(self.chunk_path(start)):
+                yield start, min(start + self.chunk_size, self.total)
+
+    def write_chunk(self, start, rows):
+        """Write a finished chunk, renaming it into place so partial files never count as done"""
+        path = self.chunk_path(start)
+        partial = path + ".partial"
+        columns = list(zip(*rows))
+        if self.file_format == "npz":
+            # Seeds use all 64 bits, so they must never pass through float64
+            arrays = {name: np.array(column, dtype=np.uint64) if name == "seed" else np.asarray(column)
+                      for name, column in zip(COLUMNS, columns)}
+            arrays["score_a"] = arrays["score_a"].astype(np.int16)
+            arrays["score_b"] = arrays["score_b"].astype(np.int16)
+            with open(partial, "wb") as f:
+                np.savez(f, **arrays)
+        else:
+            with open(partial, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                writer.writerows(rows)
+        os.replace(partial, path)
+
+    def run(self, progress=None):
+        """Play every chunk not yet on disk; return the number of matches played
+
+        `progress`, if given, is called as progress(done, total) after each chunk.
+        """
+        self.prepare()
+        todo = list(self.pending_chunks())
+        done = self.total - sum(stop - start for start, stop in todo)
+        played = 0
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            def submit(chunk):
+                return pool.submit(play_sweep_chunk, self.grid, self.seeds, self.master_seed,
+                                   self.engine_name, chunk[0], chunk[1])
+
+            for (start, _), future in submit_in_order(submit, todo, self.workers * 2):
+                rows = future.result()
+                self.write_chunk(start, rows)
+                played += len(rows)
+                done += len(rows)
+                if progress:
+                    progress(done, self.total)
+
+        return played
+
+def load_sweep(directory):
+    """Read all finished chunks of a sweep into one array (NumPy) or list (CSV) per column"""
+    with open(os.path.join(directory, "sweep.json")) as f:
+        file_format = json.load(f)["format"]
+
+    paths = sorted(glob.glob(os.path.join(directory, f"chunk_*.{file_format}")))
+    if file_format == "npz":
+        parts = [np.load(path) for path in paths]
+        return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+    columns = {name: [] for name in COLUMNS}
+    for path in paths:
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                for name in COLUMNS:
+                    columns[name].append(float(row[name]) if name in PARAMETERS else int(row[name]))
+    return columns
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep match parameters and write results in chunks")
+    parser.add_argument("directory", help="output directory; re-run with the same arguments to resume")
+    for name in PARAMETERS:
+        parser.add_argument("--" + name.replace("_", "-"), metavar="VALUES",
+                            help=f"values of {name}: a,b,c or start:stop:step (default {DEFAULTS[name][0]})")
+    parser.add_argument("--seeds", type=int, default=10, help="matches per combination")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="matches per output file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--event-driven", action="store_true", help=EVENT_DRIVEN_HELP)
+    parser.add_argument("--format", choices=("npz", "csv"), default=None,
+                        help="chunk file format (default: npz if NumPy is installed)")
+    args = parser.parse_args()
+
+    grid = {}
+    for name in PARAMETERS:
+        spec = getattr(args, name)
+        if spec is not None:
+            grid[name] = parse_values(spec)
+
+    try:
+        sweep = Sweep(args.directory, grid, seeds=args.seeds, master_seed=args.seed,
+                      chunk_size=args.chunk_size, workers=args.workers,
+                      engine_name="EventEngine" if args.event_driven else "MatchEngine",
+                      file_format=args.format)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"{sweep.combinations} combinations x {sweep.seeds} seeds = {sweep.total} matches")
+
+    def progress(done, total):
+        print(f"\r{done}/{total} matches", end="", flush=True)
+
+    try:
+        sweep.run(progress)
+    except ValueError as error:
+        parser.exit(1, f"{error}\n")
+    print()
+
+if __name__ == "__main__":
+    main()
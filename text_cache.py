@@ -0,0 +1,58 @@
+"""
+Text Cache Module
+Caches fonts and rendered text surfaces for the user interface.
+"""
+import pygame
+from collections import OrderedDict
+
+class TextCache:
+    """LRU cache of rendered text keyed by (font, size, text, colour)
+
+    Fonts are loaded once per (font, size) and kept for the lifetime of the
+    cache. Rendered surfaces are shared, so callers must not draw on them.
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+        # Counters for checking that steady-state frames hit the cache
+        self.hits = 0
+        self.misses = 0
+        self.font_loads = 0
+
+    def get_font(self, size, name=None):
+        """Return the font of the given size, loading it on first use"""
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(name, size)
+            self.fonts[key] = font
+            self.font_loads += 1
+        return font
+
+    def render(self, text, size, color, name=None, antialias=True):
+        """Return a surface with `text` rendered in the given font and colour"""
+        key = (name, size, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = self.get_font(size, name).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        """Return the cache counters as a dict"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "font_loads": self.font_loads,
+            "fonts": len(self.fonts),
+            "surfaces": len(self.surfaces),
+        }
@@ -0,0 +1,393 @@
+"""
+Tournament Module
+Builds league and knockout fixtures for many clubs, plays each round in parallel and keeps the standings.
+"""
+import argparse
+import json
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import MatchEngine, kickoff_for
+from event_engine import EVENT_DRIVEN_HELP, EventEngine
+from montecarlo import derive_seed
+from settings import Settings
+
+# A club and its physical parameters: logo size in pixels and kickoff speed
+Club = namedtuple("Club", ["name", "size", "speed", "logo"], defaults=(30, 3.0, None))
+
+# A match between clubs `home` and `away` (indices into the club list) in a
+# round; replays of drawn knockout ties count up from 1
+Fixture = namedtuple("Fixture", ["round", "home", "away", "replay"], defaults=(0,))
+
+# A played fixture and its (home, away) score
+FixtureResult = namedtuple("FixtureResult", ["fixture", "score"])
+
+def load_clubs(path):
+    """Read clubs from a JSON list of objects with a name and optional size, speed and logo"""
+    with open(path) as f:
+        return [Club(**entry) for entry in json.load(f)]
+
+def default_clubs(count):
+    """Clubs named Team A, Team B, ... with the default size and speed"""
+    clubs = []
+    for i in range(count):
+        name = ""
+        i += 1
+        while i:
+            i, letter = divmod(i - 1, 26)
+            name = chr(ord("A") + letter) + name
+        clubs.append(Club(f"Team {name}"))
+    return clubs
+
+def round_robin(count, double=False):
+    """Fixtures of a league where every club meets every other once (or home and away)
+
+    Uses the circle method: one slot stays put while the others rotate, so
+    every round has count // 2 fixtures. Home and away alternate so no club
+    plays more than two home or two away matches in a row, also where the two
+    halves of a double round robin meet. With an odd count, the fixed slot is
+    a bye: the club paired with it sits out that round, and every club plays
+    as many home matches as away ones.
+    """
+    slots = ([None] if count % 2 else []) + list(range(count))
+    n = len(slots)
+    rounds = [[] for _ in range(n - 1)]
+    for round_idx in range(n - 1):
+        for i in range(n // 2):
+            home, away = slots[i], slots[n - 1 - i]
+            if home is None or away is None:
+                continue
+            if (i == 0 and round_idx % 2) or (i > 0 and i % 2):
+                home, away = away, home
+            rounds[round_idx].append(Fixture(round_idx, home, away))
+        slots.insert(1, slots.pop())
+    fixtures = [fixture for fixtures in rounds for fixture in fixtures]
+
+    if double:
+        # The second half mirrors the first with home and away swapped. It
+        # starts from the first half's second round and ends with its first:
+        # mirroring the last round straight after it would give its home
+        # clubs a third home match in a row
+        for offset in range(n - 1):
+            mirrored = rounds[(offset + 1) % (n - 1)]
+            fixtures += [Fixture(n - 1 + offset, f.away, f.home) for f in mirrored]
+
+    assert longest_run(fixtures, count) <= 2, "round robin has three home or away matches in a row"
+    return fixtures
+
+def longest_run(fixtures, count):
+    """Most home matches, or away matches, in a row played by any of `count` clubs"""
+    runs = [(None, 0)] * count
+    longest = 0
+    for fixture in sorted(fixtures):
+        for club, at_home in ((fixture.home, True), (fixture.away, False)):
+            last, run = runs[club]
+            run = run + 1 if last == at_home else 1
+            runs[club] = (at_home, run)
+            longest = max(longest, run)
+    return longest
+
+def play_fixtures(settings, engine_class, master_seed, matches):
+    """Play (fixture, home club, away club) matches and return their scores in order
+
+    Each fixture's seed is derived from the master seed and the fixture
+    itself, so results do not depend on the worker that plays it.
+    """
+    scores = []
+    for fixture, home, away in matches:
+        rng = random.Random(derive_seed(master_seed, "{}:{}:{}:{}".format(*fixture)))
+        engine = engine_class(settings, rng=rng, kickoff=kickoff_for(home, away))
+        scores.append(engine.run().score)
+    return scores
+
+class StandingsRow:
+    """One club's line in the table, updated as each result comes in"""
+    def __init__(self, club):
+        self.club = club
+        self.played = 0
+        self.won = 0
+        self.drawn = 0
+        self.lost = 0
+        self.goals_for = 0
+        self.goals_against = 0
+        self.points = 0
+
+    @property
+    def goal_difference(self):
+        return self.goals_for - self.goals_against
+
+    def add(self, scored, conceded, points):
+        self.played += 1
+        self.goals_for += scored
+        self.goals_against += conceded
+        self.points += points
+        if scored > conceded:
+            self.won += 1
+        elif scored == conceded:
+            self.drawn += 1
+        else:
+            self.lost += 1
+
+class Standings:
+    """League table kept up to date result by result
+
+    Each result touches two rows and two head-to-head records, so adding a
+    result costs the same however many have been played. Clubs are ranked
+    by points, goal difference and goals scored; clubs still level are
+    ranked by the points, goal difference and goals they scored in the
+    matches among themselves, and then by club order.
+    """
+    def __init__(self, clubs, win_points=3, draw_points=1):
+        self.rows = [StandingsRow(club) for club in clubs]
+        self.win_points = win_points
+        self.draw_points = draw_points
+
+        # (club, opponent) -> [points, goals for, goals against] of club against opponent
+        self.head_to_head = {}
+        self.order = None
+
+    def points_for(self, scored, conceded):
+        if scored > conceded:
+            return self.win_points
+        return self.draw_points if scored == conceded else 0
+
+    def add(self, home, away, home_goals, away_goals):
+        """Fold one result into the table"""
+        for club, opponent, scored, conceded in ((home, away, home_goals, away_goals),
+                                                 (away, home, away_goals, home_goals)):
+            points = self.points_for(scored, conceded)
+            self.rows[club].add(scored, conceded, points)
+            record = self.head_to_head.setdefault((club, opponent), [0, 0, 0])
+            record[0] += points
+            record[1] += scored
+            record[2] += conceded
+        self.order = None
+
+    def head_to_head_key(self, club, group):
+        """(points, goal difference, goals) of a club in matches against the rest of its group"""
+        points = goals_for = goals_against = 0
+        for opponent in group:
+            record = self.head_to_head.get((club, opponent))
+            if record:
+                points += record[0]
+                goals_for += record[1]
+                goals_against += record[2]
+        return points, goals_for - goals_against, goals_for
+
+    def ranking(self):
+        """Club indices from first to last; cached until the next result"""
+        if self.order is not None:
+            return self.order
+
+        def overall(club):
+            row = self.rows[club]
+            return row.points, row.goal_difference, row.goals_for
+
+        order = sorted(range(len(self.rows)), key=lambda club: (overall(club), -club), reverse=True)
+
+        # Break remaining ties on results between the tied clubs only
+        ranked = []
+        i = 0
+        while i < len(order):
+            j = i + 1
+            while j < len(order) and overall(order[j]) == overall(order[i]):
+                j += 1
+            group = order[i:j]
+            if len(group) > 1:
+                group.sort(key=lambda club: (self.head_to_head_key(club, group), -club), reverse=True)
+            ranked.extend(group)
+            i = j
+
+        self.order = ranked
+        return ranked
+
+    def table(self):
+        """Rows from first to last"""
+        return [self.rows[club] for club in self.ranking()]
+
+    def format(self):
+        """The table as aligned text"""
+        width = max([len(row.club.name) for row in self.rows] + [4])
+        lines = [f"{'':>3} {'Club':<{width}} {'P':>3} {'W':>3} {'D':>3} {'L':>3} {'GF':>4} {'GA':>4} {'GD':>4} {'Pts':>4}"]
+        for position, row in enumerate(self.table(), 1):
+            lines.append(f"{position:>3} {row.club.name:<{width}} {row.played:>3} {row.won:>3} {row.drawn:>3} "
+                         f"{row.lost:>3} {row.goals_for:>4} {row.goals_against:>4} "
+                         f"{row.goal_difference:>+4} {row.points:>4}")
+        return "\n".join(lines)
+
+class Tournament:
+    """Base for competitions that play rounds of fixtures across worker processes
+
+    All fixtures of a round are played at once, split over the workers; the
+    round's results are then applied in fixture order, so the outcome does not
+    depend on the number of workers. One pool serves the whole competition.
+    """
+    def __init__(self, clubs, settings=None, master_seed=0, workers=None, engine_class=MatchEngine):
+        self.clubs = list(clubs)
+        self.settings = settings if settings is not None else Settings()
+        self.master_seed = master_seed
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.engine_class = engine_class
+        self.results = []
+        self.pool = None
+
+    def play_round(self, fixtures):
+        """Play fixtures in parallel and return their FixtureResults in order"""
+        matches = [(fixture, self.clubs[fixture.home], self.clubs[fixture.away]) for fixture in fixtures]
+        if self.pool is None:
+            scores = play_fixtures(self.settings, self.engine_class, self.master_seed, matches)
+        else:
+            # One batch per worker keeps the pickling overhead per round small
+            size = -(-len(matches) // self.workers)
+            futures = [self.pool.submit(play_fixtures, self.settings, self.engine_class,
+                                        self.master_seed, matches[start:start + size])
+                       for start in range(0, len(matches), size)]
+            scores = [score for future in futures for score in future.result()]
+
+        results = [FixtureResult(fixture, score) for fixture, score in zip(fixtures, scores)]
+        self.results.extend(results)
+        return results
+
+    def play(self, progress=None):
+        """Play the whole competition; `progress`, if given, is called after every round"""
+        if self.workers <= 1:
+            return self.play_rounds(progress)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self.pool = pool
+            try:
+                return self.play_rounds(progress)
+            finally:
+                self.pool = None
+
+class League(Tournament):
+    """Round robin or double round robin league with a standings table"""
+    def __init__(self, clubs, double=False, **tournament_kwargs):
+        super().__init__(clubs, **tournament_kwargs)
+        self.fixtures = round_robin(len(self.clubs), double)
+        self.standings = Standings(self.clubs)
+        self.matchday = 0
+
+    def matchdays(self):
+        """Fixtures grouped by round, in order"""
+        rounds = {}
+        for fixture in self.fixtures:
+            rounds.setdefault(fixture.round, []).append(fixture)
+        return [rounds[round_idx] for round_idx in sorted(rounds)]
+
+    def play_rounds(self, progress):
+        for fixtures in self.matchdays():
+            for result in self.play_round(fixtures):
+                self.standings.add(result.fixture.home, result.fixture.away, *result.score)
+            self.matchday += 1
+            if progress:
+                progress(self)
+        return self.standings
+
+class Knockout(Tournament):
+    """Single-elimination cup in which drawn ties are replayed
+
+    Clubs are seeded in list order. When the number of clubs is not a power
+    of two, the top seeds get byes through the first round. Each round the
+    remaining clubs are re-seeded, so the best seed meets the worst. A drawn
+    tie is replayed with home and away swapped, up to `max_replays` times;
+    if it is still level, a seeded coin toss decides it.
+    """
+    def __init__(self, clubs, max_replays=2, **tournament_kwargs):
+        super().__init__(clubs, **tournament_kwargs)
+        if len(self.clubs) < 2:
+            raise ValueError(f"a knockout needs at least two clubs, not {len(self.clubs)}")
+        self.max_replays = max_replays
+        self.rounds = []
+        self.winner = None
+
+    def play_rounds(self, progress):
+        remaining = list(range(len(self.clubs)))
+        bracket = 1
+        while bracket < len(remaining):
+            bracket *= 2
+        byes = remaining[:bracket - len(remaining)]
+        entrants = remaining[len(byes):]
+
+        round_idx = 0
+        while len(byes) + len(entrants) > 1:
+            ties = [Fixture(round_idx, entrants[i], entrants[-1 - i]) for i in range(len(entrants) // 2)]
+            winners = self.play_ties(ties)
+            self.rounds.append(ties)
+
+            # Winners keep the seeding of the clubs they came from
+            entrants = sorted(byes + winners)
+            byes = []
+            round_idx += 1
+            if progress:
+                progress(self)
+
+        self.winner = (byes + entrants)[0]
+        return self.clubs[self.winner]
+
+    def play_ties(self, ties):
+        """Play a round's ties, replaying drawn ones together, and return the winners in tie order"""
+        winners = [None] * len(ties)
+        pending = list(enumerate(ties))
+        for replay in range(self.max_replays + 1):
+            # Replays alternate which club is at home
+            fixtures = []
+            for _, tie in pending:
+                home, away = (tie.away, tie.home) if replay % 2 else (tie.home, tie.away)
+                fixtures.append(Fixture(tie.round, home, away, replay))
+            drawn = []
+            for (i, tie), result in zip(pending, self.play_round(fixtures)):
+                home_goals, away_goals = result.score
+                if home_goals == away_goals:
+                    drawn.append((i, tie))
+                else:
+                    winners[i] = result.fixture.home if home_goals > away_goals else result.fixture.away
+            pending = drawn
+            if not pending:
+                break
+
+        for i, tie in pending:
+            rng = random.Random(derive_seed(self.master_seed, "toss:{}:{}:{}".format(*tie)))
+            winners[i] = rng.choice((tie.home, tie.away))
+        return winners
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a league or knockout tournament")
+    parser.add_argument("--format", choices=("league", "double", "knockout"), default="double",
+                        help="round robin, home-and-away round robin, or knockout with replays")
+    parser.add_argument("--clubs", metavar="PATH",
+                        help='JSON list of clubs, e.g. [{"name": "Reds", "size": 34, "speed": 2.5}]')
+    parser.add_argument("--teams", type=int, default=20, help="number of default clubs without --clubs")
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--event-driven", action="store_true", help=EVENT_DRIVEN_HELP)
+    parser.add_argument("--replays", type=int, default=2, help="replays of a drawn knockout tie")
+    args = parser.parse_args()
+
+    clubs = load_clubs(args.clubs) if args.clubs else default_clubs(args.teams)
+    kwargs = dict(master_seed=args.seed, workers=args.workers,
+                  engine_class=EventEngine if args.event_driven else MatchEngine)
+
+    if args.format == "knockout":
+        cup = Knockout(clubs, max_replays=args.replays, **kwargs)
+        cup.play()
+        for result in cup.results:
+            fixture = result.fixture
+            replay = f" (replay {fixture.replay})" if fixture.replay else ""
+            print(f"Round {fixture.round + 1}: {clubs[fixture.home].name} {result.score[0]}-{result.score[1]} "
+                  f"{clubs[fixture.away].name}{replay}")
+        print(f"Winner: {clubs[cup.winner].name}")
+        return
+
+    league = League(clubs, double=args.format == "double", **kwargs)
+
+    def progress(league):
+        print(f"\rMatchday {league.matchday}/{len(league.matchdays())}", end="", flush=True)
+
+    league.play(progress)
+    print()
+    print(league.standings.format())
+
+if __name__ == "__main__":
+    main()
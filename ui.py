@@ -6,6 +6,9 @@ import pygame
 import math
 from pygame.locals import *
 
+from overlay import OverlayPool
+from text_cache import TextCache
+
 class UI:
     def __init__(self, screen, width, height):
         self.screen = screen
@@ -18,28 +21,119 @@ class UI:
         self.BLACK = (0, 0, 0)
         self.GRAY = (200, 200, 200)
         
-        # Fonts
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
-        self.large_font = pygame.font.Font(None, 60)
+        # Font sizes
+        self.FONT_SIZE = 36
+        self.SMALL_FONT_SIZE = 24
+        self.LARGE_FONT_SIZE = 60
+        
+        # Fonts and rendered text are cached across frames
+        self.text = TextCache()
+        
+        # Full-screen tints are built once and reused
+        self.overlays = OverlayPool()
+        
+        # Widget rects, computed once and used for drawing and hit-testing
+        self.layout = {}
+        self.layout_size = None
+        self.build_layout()
         
+    def build_layout(self):
+        """Compute the rects of every clickable widget for the current screen size"""
+        if self.layout_size == (self.WIDTH, self.HEIGHT):
+            return
+        self.layout_size = (self.WIDTH, self.HEIGHT)
+        
+        # Play/pause, reset and settings buttons
+        button_width = 100
+        button_height = 40
+        buttons = {
+            "play": pygame.Rect(self.WIDTH//2 - button_width - 10, self.HEIGHT - 60, button_width, button_height),
+            "reset": pygame.Rect(self.WIDTH//2 + 10, self.HEIGHT - 60, button_width, button_height),
+            "settings": pygame.Rect(self.WIDTH//2 - button_width//2, self.HEIGHT - 110, button_width, button_height)
+        }
+        
+        # Settings menu: two name fields, the speed slider and the save button
+        settings_bg = pygame.Rect(self.WIDTH//2 - 150, self.HEIGHT//2 - 150, 300, 300)
+        y_pos = settings_bg.top + 70
+        spacing = 50
+        settings = {
+            "team1_name": pygame.Rect(settings_bg.left + 150, y_pos - 5, 130, 30),
+            "team2_name": pygame.Rect(settings_bg.left + 150, y_pos + spacing - 5, 130, 30),
+            "slider_track": pygame.Rect(settings_bg.left + 150, y_pos + 2 * spacing + 8, 130, 6),
+            "close": pygame.Rect(self.WIDTH//2 - 50, settings_bg.bottom - 50, 100, 40)
+        }
+        
+        self.settings_bg = settings_bg
+        self.layout = {
+            "buttons": buttons,
+            "settings": settings,
+            "end": {"play_again": pygame.Rect(self.WIDTH//2 - 75, self.HEIGHT//2 + 70, 150, 40)}
+        }
+    
+    def hit_test(self, screen_name, pos):
+        """Name of the widget under pos on a screen ("buttons", "settings" or "end"), or None"""
+        for name, rect in self.layout[screen_name].items():
+            if rect.collidepoint(pos):
+                return name
+        return None
+    
+    def settings_areas(self):
+        """Clickable areas of the settings menu"""
+        return self.layout["settings"]
+    
+    def standings(self, teams):
+        """Teams ordered by score, highest first (ties keep team order)"""
+        return sorted(teams, key=lambda team: -team.score)
+    
+    def result_text(self, teams):
+        """Describe the result: the sole top scorer wins, otherwise it's a draw"""
+        table = self.standings(teams)
+        if table[0].score > table[1].score:
+            return f"{table[0].name} wins!"
+        return "It's a draw!"
+    
+    def draw_leaderboard(self, teams, game_time, settings, rows=4):
+        """Draw the top of the table and the clock for matches with more than two teams"""
+        y_pos = 10
+        row_height = 22
+        for team in self.standings(teams)[:rows]:
+            logo = team.logo
+            self.screen.blit(logo, (10, y_pos + row_height//2 - logo.get_height()//2))
+            name_text = self.text.render(team.name, self.SMALL_FONT_SIZE, self.WHITE)
+            score_text = self.text.render(str(team.score), self.SMALL_FONT_SIZE, self.WHITE)
+            self.screen.blit(name_text, (45, y_pos + 3))
+            self.screen.blit(score_text, (170 - score_text.get_width(), y_pos + 3))
+            y_pos += row_height
+        
+        # Time in the top right corner
+        time_text = self.text.render(settings.format_time(game_time), self.FONT_SIZE, self.WHITE)
+        time_pos = (self.WIDTH - 20 - time_text.get_width(), 25)
+        self.screen.blit(time_text, time_pos)
+        
+        return {
+            "score": pygame.Rect(10, 10, 160, rows * row_height),
+            "clock": time_text.get_rect(topleft=time_pos)
+        }
+    
     def draw_scoreboard(self, teams, game_time, settings, score_pulse_timer=0):
-        """Draw the scoreboard with team info and score"""
+        """Draw the scoreboard with team info and score, returning the score and clock rects"""
+        if len(teams) > 2:
+            return self.draw_leaderboard(teams, game_time, settings)
+        
         # Team names and icons
-        team1_text = self.font.render(teams[0].name, True, self.WHITE)
-        team2_text = self.font.render(teams[1].name, True, self.WHITE)
+        team1_text = self.text.render(teams[0].name, self.FONT_SIZE, self.WHITE)
+        team2_text = self.text.render(teams[1].name, self.FONT_SIZE, self.WHITE)
         
         # Score
         if score_pulse_timer > 0:
             # Larger font for pulsing effect
             pulse_size = int(36 + 10 * math.sin(score_pulse_timer * 20))
-            pulse_font = pygame.font.Font(None, pulse_size)
-            score_text = pulse_font.render(f"{teams[0].score}:{teams[1].score}", True, self.WHITE)
+            score_text = self.text.render(f"{teams[0].score}:{teams[1].score}", pulse_size, self.WHITE)
         else:
-            score_text = self.font.render(f"{teams[0].score}:{teams[1].score}", True, self.WHITE)
+            score_text = self.text.render(f"{teams[0].score}:{teams[1].score}", self.FONT_SIZE, self.WHITE)
         
         # Time
-        time_text = self.font.render(settings.format_time(game_time), True, self.WHITE)
+        time_text = self.text.render(settings.format_time(game_time), self.FONT_SIZE, self.WHITE)
         
         # Draw team info on top
         self.screen.blit(teams[0].logo, (20, 20))
@@ -49,23 +143,33 @@ class UI:
         self.screen.blit(teams[1].logo, (self.WIDTH - 50, 20))
         
         # Draw time below score
-        self.screen.blit(time_text, (self.WIDTH//2 - time_text.get_width()//2, 70))
+        time_pos = (self.WIDTH//2 - time_text.get_width()//2, 70)
+        self.screen.blit(time_text, time_pos)
+        
+        return {
+            "score": score_text.get_rect(topleft=(self.WIDTH//2 - score_text.get_width()//2, 25)),
+            "clock": time_text.get_rect(topleft=time_pos)
+        }
+    
+    def draw_time_scale(self, time_scale):
+        """Show the simulation speed below the clock"""
+        scale_text = self.text.render(f"x{time_scale}", self.SMALL_FONT_SIZE, self.GRAY)
+        self.screen.blit(scale_text, (self.WIDTH//2 - scale_text.get_width()//2, 100))
     
     def draw_buttons(self, is_playing):
         """Draw play/pause, reset, and settings buttons"""
-        button_width = 100
-        button_height = 40
-        play_button = pygame.Rect(self.WIDTH//2 - button_width - 10, self.HEIGHT - 60, button_width, button_height)
-        reset_button = pygame.Rect(self.WIDTH//2 + 10, self.HEIGHT - 60, button_width, button_height)
-        settings_button = pygame.Rect(self.WIDTH//2 - button_width//2, self.HEIGHT - 110, button_width, button_height)
+        buttons = self.layout["buttons"]
+        play_button = buttons["play"]
+        reset_button = buttons["reset"]
+        settings_button = buttons["settings"]
         
         pygame.draw.rect(self.screen, self.WHITE, play_button, border_radius=5)
         pygame.draw.rect(self.screen, self.WHITE, reset_button, border_radius=5)
         pygame.draw.rect(self.screen, self.WHITE, settings_button, border_radius=5)
         
-        play_text = self.font.render("Pause" if is_playing else "Play", True, self.PURPLE)
-        reset_text = self.font.render("Reset", True, self.PURPLE)
-        settings_text = self.font.render("Settings", True, self.PURPLE)
+        play_text = self.text.render("Pause" if is_playing else "Play", self.FONT_SIZE, self.PURPLE)
+        reset_text = self.text.render("Reset", self.FONT_SIZE, self.PURPLE)
+        settings_text = self.text.render("Settings", self.FONT_SIZE, self.PURPLE)
         
         self.screen.blit(play_text, (play_button.centerx - play_text.get_width()//2, 
                                     play_button.centery - play_text.get_height()//2))
@@ -74,56 +178,48 @@ class UI:
         self.screen.blit(settings_text, (settings_button.centerx - settings_text.get_width()//2, 
                                        settings_button.centery - settings_text.get_height()//2))
         
-        return {
-            "play": play_button,
-            "reset": reset_button,
-            "settings": settings_button
-        }
+        return buttons
     
     def draw_settings_menu(self, settings):
         """Draw settings menu and return clickable areas"""
+        areas = self.layout["settings"]
+        
         # Settings background
-        settings_bg = pygame.Rect(self.WIDTH//2 - 150, self.HEIGHT//2 - 150, 300, 300)
+        settings_bg = self.settings_bg
         pygame.draw.rect(self.screen, self.WHITE, settings_bg, border_radius=10)
         
         # Settings title
-        title_text = self.font.render("Game Settings", True, self.BLACK)
+        title_text = self.text.render("Game Settings", self.FONT_SIZE, self.BLACK)
         self.screen.blit(title_text, (self.WIDTH//2 - title_text.get_width()//2, settings_bg.top + 20))
         
-        # Settings options
-        y_pos = settings_bg.top + 70
-        spacing = 50
-        
         # Team 1 Name
-        team1_label = self.small_font.render("Team A Name:", True, self.BLACK)
-        self.screen.blit(team1_label, (settings_bg.left + 20, y_pos))
+        team1_value_bg = areas["team1_name"]
+        team1_label = self.text.render("Team A Name:", self.SMALL_FONT_SIZE, self.BLACK)
+        self.screen.blit(team1_label, (settings_bg.left + 20, team1_value_bg.top + 5))
         
-        team1_value_bg = pygame.Rect(settings_bg.left + 150, y_pos - 5, 130, 30)
         pygame.draw.rect(self.screen, self.GRAY if settings.active_setting != "team1_name" else (220, 220, 255), team1_value_bg, border_radius=5)
         pygame.draw.rect(self.screen, self.BLACK, team1_value_bg, 1, border_radius=5)
         
-        team1_value = self.small_font.render(settings.team1_name if settings.active_setting != "team1_name" else settings.text_input, True, self.BLACK)
+        team1_value = self.text.render(settings.team1_name if settings.active_setting != "team1_name" else settings.text_input, self.SMALL_FONT_SIZE, self.BLACK)
         self.screen.blit(team1_value, (team1_value_bg.left + 5, team1_value_bg.centery - team1_value.get_height()//2))
         
         # Team 2 Name
-        y_pos += spacing
-        team2_label = self.small_font.render("Team B Name:", True, self.BLACK)
-        self.screen.blit(team2_label, (settings_bg.left + 20, y_pos))
+        team2_value_bg = areas["team2_name"]
+        team2_label = self.text.render("Team B Name:", self.SMALL_FONT_SIZE, self.BLACK)
+        self.screen.blit(team2_label, (settings_bg.left + 20, team2_value_bg.top + 5))
         
-        team2_value_bg = pygame.Rect(settings_bg.left + 150, y_pos - 5, 130, 30)
         pygame.draw.rect(self.screen, self.GRAY if settings.active_setting != "team2_name" else (220, 220, 255), team2_value_bg, border_radius=5)
         pygame.draw.rect(self.screen, self.BLACK, team2_value_bg, 1, border_radius=5)
         
-        team2_value = self.small_font.render(settings.team2_name if settings.active_setting != "team2_name" else settings.text_input, True, self.BLACK)
+        team2_value = self.text.render(settings.team2_name if settings.active_setting != "team2_name" else settings.text_input, self.SMALL_FONT_SIZE, self.BLACK)
         self.screen.blit(team2_value, (team2_value_bg.left + 5, team2_value_bg.centery - team2_value.get_height()//2))
         
         # Rotation Speed (with slider)
-        y_pos += spacing
-        speed_label = self.small_font.render("Rotation Speed:", True, self.BLACK)
-        self.screen.blit(speed_label, (settings_bg.left + 20, y_pos))
+        slider_track = areas["slider_track"]
+        speed_label = self.text.render("Rotation Speed:", self.SMALL_FONT_SIZE, self.BLACK)
+        self.screen.blit(speed_label, (settings_bg.left + 20, slider_track.top - 8))
         
         # Draw slider track
-        slider_track = pygame.Rect(settings_bg.left + 150, y_pos + 8, 130, 6)
         pygame.draw.rect(self.screen, self.GRAY, slider_track, border_radius=3)
         
         # Calculate slider handle position (speed range 0.1 to 2.0)
@@ -140,63 +236,60 @@ class UI:
         pygame.draw.circle(self.screen, self.WHITE, handle_center, handle_radius - 2)
         
         # Display current speed value
-        speed_value_text = self.small_font.render(f"{settings.rotation_speed:.1f}", True, self.BLACK)
+        speed_value_text = self.text.render(f"{settings.rotation_speed:.1f}", self.SMALL_FONT_SIZE, self.BLACK)
         self.screen.blit(speed_value_text, (slider_track.right + 10, slider_track.centery - speed_value_text.get_height()//2))
         
         # Close button
-        y_pos += spacing + 20
-        close_button = pygame.Rect(self.WIDTH//2 - 50, settings_bg.bottom - 50, 100, 40)
+        close_button = areas["close"]
         pygame.draw.rect(self.screen, self.PURPLE, close_button, border_radius=5)
         
-        close_text = self.small_font.render("Save", True, self.WHITE)
+        close_text = self.text.render("Save", self.SMALL_FONT_SIZE, self.WHITE)
         self.screen.blit(close_text, (close_button.centerx - close_text.get_width()//2, close_button.centery - close_text.get_height()//2))
         
-        return {
-            "team1_name": team1_value_bg,
-            "team2_name": team2_value_bg,
-            "slider_track": slider_track,
-            "close": close_button
-        }
+        return areas
+    
+    def play_again_rect(self):
+        """Rect of the Play Again button on the end screen"""
+        return self.layout["end"]["play_again"]
     
     def draw_match_end_screen(self, teams, game_time, settings):
         """Display end of match screen with results"""
         if game_time >= settings.match_duration:
-            # Create semi-transparent overlay
-            overlay = pygame.Surface((self.WIDTH, self.HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))  # Dark overlay with transparency
-            self.screen.blit(overlay, (0, 0))
+            # Dark semi-transparent overlay
+            self.overlays.blit(self.screen, self.BLACK, 180)
             
             # Match end text
-            end_text = self.font.render("FULL TIME", True, self.WHITE)
+            end_text = self.text.render("FULL TIME", self.FONT_SIZE, self.WHITE)
             self.screen.blit(end_text, (self.WIDTH//2 - end_text.get_width()//2, self.HEIGHT//2 - 80))
             
-            # Score
-            score_text = self.large_font.render(f"{teams[0].score} - {teams[1].score}", True, self.WHITE)
-            self.screen.blit(score_text, (self.WIDTH//2 - score_text.get_width()//2, self.HEIGHT//2 - 30))
-            
-            # Team names
-            team1_name = self.small_font.render(teams[0].name, True, self.WHITE)
-            team2_name = self.small_font.render(teams[1].name, True, self.WHITE)
-            
-            self.screen.blit(team1_name, (self.WIDTH//2 - score_text.get_width()//2 - team1_name.get_width() - 10, self.HEIGHT//2 - 20))
-            self.screen.blit(team2_name, (self.WIDTH//2 + score_text.get_width()//2 + 10, self.HEIGHT//2 - 20))
-            
-            # Result text
-            if teams[0].score > teams[1].score:
-                result_text = f"{teams[0].name} wins!"
-            elif teams[1].score > teams[0].score:
-                result_text = f"{teams[1].name} wins!"
+            if len(teams) > 2:
+                # Top three of the table
+                y_pos = self.HEIGHT//2 - 45
+                for place, team in enumerate(self.standings(teams)[:3], 1):
+                    row_text = self.text.render(f"{place}. {team.name}  {team.score}", self.SMALL_FONT_SIZE, self.WHITE)
+                    self.screen.blit(row_text, (self.WIDTH//2 - row_text.get_width()//2, y_pos))
+                    y_pos += 20
             else:
-                result_text = "It's a draw!"
+                # Score
+                score_text = self.text.render(f"{teams[0].score} - {teams[1].score}", self.LARGE_FONT_SIZE, self.WHITE)
+                self.screen.blit(score_text, (self.WIDTH//2 - score_text.get_width()//2, self.HEIGHT//2 - 30))
                 
-            result_render = self.font.render(result_text, True, self.WHITE)
+                # Team names
+                team1_name = self.text.render(teams[0].name, self.SMALL_FONT_SIZE, self.WHITE)
+                team2_name = self.text.render(teams[1].name, self.SMALL_FONT_SIZE, self.WHITE)
+                
+                self.screen.blit(team1_name, (self.WIDTH//2 - score_text.get_width()//2 - team1_name.get_width() - 10, self.HEIGHT//2 - 20))
+                self.screen.blit(team2_name, (self.WIDTH//2 + score_text.get_width()//2 + 10, self.HEIGHT//2 - 20))
+            
+            # Result text
+            result_render = self.text.render(self.result_text(teams), self.FONT_SIZE, self.WHITE)
             self.screen.blit(result_render, (self.WIDTH//2 - result_render.get_width()//2, self.HEIGHT//2 + 20))
             
             # Play again button
-            play_again_button = pygame.Rect(self.WIDTH//2 - 75, self.HEIGHT//2 + 70, 150, 40)
+            play_again_button = self.play_again_rect()
             pygame.draw.rect(self.screen, self.WHITE, play_again_button, border_radius=5)
             
-            play_again_text = self.font.render("Play Again", True, self.PURPLE)
+            play_again_text = self.text.render("Play Again", self.FONT_SIZE, self.PURPLE)
             self.screen.blit(play_again_text, (play_again_button.centerx - play_again_text.get_width()//2, 
                                             play_again_button.centery - play_again_text.get_height()//2))
             